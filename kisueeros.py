@@ -1,14 +1,39 @@
 #!/usr/bin/env python3
+import time
+_IMPORT_START = time.perf_counter()
 import os
 import sys
-import time
-import random
+import stat
 import datetime
-import platform
-import shutil
-import json
-from colorama import  Fore
-from pathlib import Path
+from collections import OrderedDict, deque, namedtuple
+
+# Heavier modules (json, random, platform, shutil, re, ...) are imported where
+# they are used so that startup only pays for what a session actually runs.
+
+STARTUP_BUDGET_MS = 30.0
+PAGE_SIZE = 20
+PRIORITIES = {"low": 1, "normal": 2, "high": 3}
+MAX_REMINDERS_SHOWN = 5
+CONFIG_FLUSH_DELAY = 1.0
+MAX_CALC_POINTS = 10000000
+IO_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+RM_BATCH = 256
+CPU_WORKERS = os.cpu_count() or 1
+WALK_BATCH = 512
+OUTPUT_BUFFER_SIZE = 64 * 1024
+PROFILE_TOP = 15
+HISTORY_SIZE = 1000
+TRIE_DIRS = 8
+
+CHUNK_SIZE = 1024 * 1024
+COPY_CHUNK = 64 * 1024 * 1024  # bytes per in-kernel copy call, so progress and Ctrl-C stay responsive
+LARGE_COPY = 16 * 1024 * 1024  # copies at least this big report their throughput
+ARCHIVE_BLOCK = 1024 * 1024  # input bytes per independently compressed gzip member
+WATCH_POLL_INTERVAL = 0.5  # seconds between scans when inotify is unavailable
+WATCH_COALESCE = 0.05  # a burst of events ends after this much quiet...
+WATCH_COALESCE_MAX = 0.5  # ...or after this long, so a busy file still gets reported
+
+EntryInfo = namedtuple("EntryInfo", "name is_dir is_link mode size mtime")
 
 class Colors:
     HEADER = '\033[95m'
@@ -20,133 +45,2408 @@ class Colors:
     ENDC = '\033[0m'
     BOLD = '\033[1m'
     UNDERLINE = '\033[4m'
+    RESET = '\033[39m'
     
     @staticmethod
     def colorize(text, color):
         return f"{color}{text}{Colors.ENDC}"
 
+class PagerQuit(BaseException):
+    """Raised through a command when the user quits the pager"""
+
+
+class OutputWriter:
+    """Buffered stand-in for sys.stdout while a command runs.
+
+    Writes are collected and passed on in large blocks. ANSI escapes are
+    stripped when the real stream is not a terminal, and when pager_rows is
+    set, output taller than the screen stops at a --More-- prompt.
+    """
+
+    ANSI_PATTERN = None
+
+    def __init__(self, stream, pager_rows=None, buffer_size=OUTPUT_BUFFER_SIZE):
+        self.stream = stream
+        self.pager_rows = pager_rows
+        self.buffer_size = buffer_size
+        self.strip_ansi = not stream.isatty()
+        self.parts = []
+        self.size = 0
+        self.lines = 0
+        if self.strip_ansi and OutputWriter.ANSI_PATTERN is None:
+            import re
+            OutputWriter.ANSI_PATTERN = re.compile(r"\033\[[0-9;?]*[A-Za-z]")
+
+    def write(self, text):
+        if self.strip_ansi and "\033" in text:
+            text = self.ANSI_PATTERN.sub("", text)
+        if self.pager_rows:
+            self.write_paged(text)
+        else:
+            self.parts.append(text)
+            self.size += len(text)
+            if self.size >= self.buffer_size:
+                self.flush()
+        return len(text)
+
+    def write_paged(self, text):
+        while text:
+            newline = text.find("\n")
+            if newline < 0:
+                self.parts.append(text)
+                return
+            self.parts.append(text[:newline + 1])
+            text = text[newline + 1:]
+            self.lines += 1
+            if self.lines >= self.pager_rows - 1:
+                self.flush()
+                self.more()
+
+    def more(self):
+        """Show the --More-- prompt and decide how far to scroll"""
+        self.stream.write("\033[7m--More-- (space: page, enter: line, q: quit)\033[0m")
+        self.stream.flush()
+        key = read_key()
+        self.stream.write("\r\033[K")
+        if key in ("q", "Q", "\x03"):
+            self.stream.flush()
+            raise PagerQuit()
+        self.lines = self.pager_rows - 2 if key in ("\r", "\n") else 0
+
+    def flush(self):
+        if self.parts:
+            self.stream.write("".join(self.parts))
+            self.parts = []
+            self.size = 0
+        self.stream.flush()
+
+    def writelines(self, lines):
+        for line in lines:
+            self.write(line)
+
+    def isatty(self):
+        return self.stream.isatty()
+
+    def fileno(self):
+        return self.stream.fileno()
+
+    @property
+    def encoding(self):
+        return getattr(self.stream, "encoding", "utf-8")
+
+    @property
+    def buffer(self):
+        """Raw byte stream for binary output, unless the pager has to see it"""
+        if self.pager_rows:
+            return None
+        return getattr(self.stream, "buffer", None)
+
+
+def read_key():
+    """Read a single key press from the terminal"""
+    try:
+        import termios
+        import tty
+    except ImportError:
+        try:
+            import msvcrt
+            return msvcrt.getwch()
+        except ImportError:
+            return (input() or "\n")[:1]
+    fd = sys.stdin.fileno()
+    old = termios.tcgetattr(fd)
+    try:
+        tty.setcbreak(fd)
+        return sys.stdin.read(1)
+    finally:
+        termios.tcsetattr(fd, termios.TCSADRAIN, old)
+
+
+def readline_prompt(prompt):
+    """Mark the colour codes in a prompt as zero-width so readline measures it correctly"""
+    import re
+    return re.sub(r"(\033\[[0-9;]*m)", "\001\\1\002", prompt)
+
+
+class NullLock:
+    """Stand-in for threading.Lock while a structure is only used from one thread"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+class ContextOutput:
+    """sys.stdout/sys.stderr stand-in that writes to the stream bound in the current context.
+
+    Used by server mode so that every session's commands print to their own
+    connection. The binding is a context variable, so it follows background
+    jobs started from a session as well.
+    """
+
+    def __init__(self, default):
+        import contextvars
+        self.default = default
+        self.target = contextvars.ContextVar("pyos_output", default=None)
+
+    def bind(self, stream):
+        """Send output in the current context to stream; pass the result to unbind()"""
+        return self.target.set(stream)
+
+    def unbind(self, token):
+        self.target.reset(token)
+
+    @property
+    def stream(self):
+        stream = self.target.get()
+        return self.default if stream is None else stream
+
+    def write(self, text):
+        return self.stream.write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+class PrefixTrie:
+    """Prefix tree for completion: lookups cost the prefix length plus the matches"""
+
+    def __init__(self, items=()):
+        self.root = {}
+        for key, value in items:
+            self.insert(key, value)
+
+    def insert(self, key, value):
+        node = self.root
+        for char in key:
+            node = node.setdefault(char, {})
+        node[None] = value  # None never clashes with a character key
+
+    def values(self, prefix):
+        """Return the values of all keys starting with prefix"""
+        node = self.root
+        for char in prefix:
+            node = node.get(char)
+            if node is None:
+                return []
+        results = []
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            for key, child in node.items():
+                if key is None:
+                    results.append(child)
+                else:
+                    stack.append(child)
+        return results
+
+
+class DirectoryCache:
+    """LRU cache of directory listings, validated against each directory's inode and mtime.
+
+    A directory's mtime only changes when entries are added, removed or renamed,
+    so names and types are always current. The stat fields of the entries can lag
+    behind in-place edits; callers that display them should ask for a fresh scan.
+    """
+
+    def __init__(self, max_dirs=256, max_items=1000000):
+        self.max_dirs = max_dirs
+        self.max_items = max_items
+        self.dirs = OrderedDict()  # path -> ((ino, mtime_ns), {name: EntryInfo})
+        self.tries = OrderedDict()  # path -> (listing, PrefixTrie of completions)
+        self.items = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = NullLock()  # server mode swaps in a real lock for its sessions
+
+    def listing(self, path, loader, fresh=False):
+        """Return {name: EntryInfo} for path, calling loader(path) only when needed"""
+        st = os.stat(path)
+        key = (st.st_ino, st.st_mtime_ns)
+        with self.lock:
+            cached = self.dirs.get(path)
+            if cached is not None and cached[0] == key and not fresh:
+                self.hits += 1
+                self.dirs.move_to_end(path)
+                return cached[1]
+            self.misses += 1
+
+        # Scan without holding the lock so other sessions keep their cache hits
+        entries = {entry.name: entry for entry in loader(path)}
+        with self.lock:
+            cached = self.dirs.get(path)
+            if cached is not None:
+                self.items -= len(cached[1])
+            self.dirs[path] = (key, entries)
+            self.dirs.move_to_end(path)
+            self.items += len(entries)
+            while len(self.dirs) > 1 and (len(self.dirs) > self.max_dirs or self.items > self.max_items):
+                _, (_, evicted) = self.dirs.popitem(last=False)
+                self.items -= len(evicted)
+        return entries
+
+    def is_dir(self, path):
+        """Check for a directory, answering from the parent's cached listing when possible"""
+        parent, name = os.path.split(path)
+        with self.lock:
+            cached = self.dirs.get(parent)
+        if cached is not None and name:
+            try:
+                st = os.stat(parent)
+            except OSError:
+                return False
+            if cached[0] == (st.st_ino, st.st_mtime_ns):
+                with self.lock:
+                    self.hits += 1
+                entry = cached[1].get(name)
+                return entry is not None and entry.is_dir
+        return os.path.isdir(path)
+
+    def completions(self, path, loader, prefix):
+        """Return entry names under path starting with prefix (directories end in '/')"""
+        entries = self.listing(path, loader)
+        with self.lock:
+            cached = self.tries.get(path)
+            if cached is None or cached[0] is not entries:
+                trie = PrefixTrie((name, name + "/" if entry.is_dir else name) for name, entry in entries.items())
+                cached = self.tries[path] = (entries, trie)
+                while len(self.tries) > TRIE_DIRS:
+                    self.tries.popitem(last=False)
+            self.tries.move_to_end(path)
+        return cached[1].values(prefix)
+
+    def clear(self):
+        with self.lock:
+            self.dirs.clear()
+            self.tries.clear()
+            self.items = 0
+
+    def memory_usage(self):
+        """Approximate number of bytes held by cached listings"""
+        with self.lock:
+            total = sys.getsizeof(self.dirs)
+            listings = list(self.dirs.items())
+        # Stored listings are replaced, never mutated, so they can be measured unlocked
+        for path, (key, entries) in listings:
+            total += sys.getsizeof(path) + sys.getsizeof(entries)
+            for name, entry in entries.items():
+                total += sys.getsizeof(name) + sys.getsizeof(entry)
+        return total
+
+
+class ProgressMeter:
+    """Rate-limited, single-line progress display that only draws on a terminal"""
+
+    def __init__(self, interval=0.2):
+        self.enabled = sys.stdout.isatty()
+        self.interval = interval
+        self.started = time.monotonic()
+        self.last = 0.0
+        self.shown = False
+
+    def elapsed(self):
+        return max(time.monotonic() - self.started, 1e-9)
+
+    def update(self, text_function):
+        """Redraw the line with text_function() if the interval has passed"""
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        if now - self.last >= self.interval:
+            self.last = now
+            self.shown = True
+            sys.stdout.write(f"\r\033[K{text_function()}")
+            sys.stdout.flush()
+
+    def clear(self):
+        if self.shown:
+            sys.stdout.write("\r\033[K")
+            sys.stdout.flush()
+            self.shown = False
+
+
+class LatencyHistogram:
+    """Wall and CPU time of one command, bucketed by powers of two microseconds"""
+
+    BUCKETS = 32  # the last bucket holds everything from ~18 minutes up
+
+    def __init__(self):
+        self.counts = [0] * self.BUCKETS
+        self.count = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.max = 0.0
+
+    def record(self, wall, cpu):
+        self.counts[min(int(wall * 1e6).bit_length(), self.BUCKETS - 1)] += 1
+        self.count += 1
+        self.wall += wall
+        self.cpu += cpu
+        self.max = max(self.max, wall)
+
+    def percentile(self, fraction):
+        """Upper bound (seconds) of the bucket holding the given fraction of calls"""
+        target = fraction * self.count
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= target:
+                return min((1 << bucket) / 1e6, self.max)
+        return self.max
+
+    def buckets(self):
+        """Yield (upper bound in seconds, count) for the non-empty buckets"""
+        for bucket, count in enumerate(self.counts):
+            if count:
+                yield (1 << bucket) / 1e6, count
+
+
+class ProcMonitor:
+    """Incremental system sampler that reads /proc directly.
+
+    The /proc files are opened once and re-read with pread, so a sample costs
+    one read per process plus a directory listing of /proc to notice new and
+    exited processes. At most half of the RLIMIT_NOFILE soft limit is spent
+    on cached descriptors; processes beyond that are opened, read and closed
+    each sample. CPU usage is computed from the deltas between samples.
+    """
+
+    def __init__(self):
+        self.ticks_per_second = os.sysconf("SC_CLK_TCK")
+        self.page_size = os.sysconf("SC_PAGE_SIZE")
+        self.stat_fd = os.open("/proc/stat", os.O_RDONLY)
+        self.meminfo_fd = os.open("/proc/meminfo", os.O_RDONLY)
+        self.pid_fds = {}  # pid -> fd of /proc/<pid>/stat
+        self.max_pid_fds = self.fd_budget()
+        self.previous_ticks = {}  # pid -> utime + stime at the last sample
+        self.previous_cpu = None  # (total, idle) jiffies at the last sample
+
+    def close(self):
+        for fd in [self.stat_fd, self.meminfo_fd, *self.pid_fds.values()]:
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+        self.pid_fds.clear()
+
+    @staticmethod
+    def fd_budget():
+        """How many per-process descriptors to keep open, leaving room for everything else"""
+        import resource
+        soft = resource.getrlimit(resource.RLIMIT_NOFILE)[0]
+        if soft == resource.RLIM_INFINITY:
+            soft = 65536
+        return max(0, min(soft, 65536) // 2 - 16)
+
+    def read(self, fd):
+        return os.pread(fd, 65536, 0)
+
+    def read_pid(self, pid):
+        """Read /proc/<pid>/stat, keeping the descriptor open while the budget allows"""
+        fd = self.pid_fds.get(pid)
+        if fd is not None:
+            try:
+                return self.read(fd)
+            except OSError:
+                os.close(self.pid_fds.pop(pid))
+                raise
+        fd = os.open(f"/proc/{pid}/stat", os.O_RDONLY)
+        if len(self.pid_fds) < self.max_pid_fds:
+            self.pid_fds[pid] = fd
+            return self.read(fd)
+        try:
+            return self.read(fd)
+        finally:
+            os.close(fd)
+
+    def system(self):
+        """Return (cpu percent since last sample, total memory kB, available memory kB)"""
+        fields = self.read(self.stat_fd).split(b"\n", 1)[0].split()[1:]
+        values = [int(value) for value in fields]
+        total, idle = sum(values), values[3] + values[4]
+        busy = 0.0
+        if self.previous_cpu is not None:
+            total_delta = total - self.previous_cpu[0]
+            idle_delta = idle - self.previous_cpu[1]
+            busy = 100.0 * (total_delta - idle_delta) / total_delta if total_delta else 0.0
+        self.previous_cpu = (total, idle)
+
+        memory = {}
+        for line in self.read(self.meminfo_fd).split(b"\n"):
+            key, _, value = line.partition(b":")
+            if key in (b"MemTotal", b"MemAvailable"):
+                memory[key] = int(value.split()[0])
+        return busy, memory.get(b"MemTotal", 0), memory.get(b"MemAvailable", 0)
+
+    def processes(self, interval):
+        """Return [(cpu percent, rss bytes, pid, name, state)] for every process"""
+        pids = {int(name) for name in os.listdir("/proc") if name.isdigit()}
+        for pid in list(self.pid_fds):
+            if pid not in pids:
+                os.close(self.pid_fds.pop(pid))
+                self.previous_ticks.pop(pid, None)
+
+        results = []
+        scale = 100.0 / (interval * self.ticks_per_second) if interval else 0.0
+        for pid in pids:
+            try:
+                data = self.read_pid(pid)
+            except OSError:
+                continue
+            head, _, tail = data.rpartition(b")")
+            fields = tail.split()
+            ticks = int(fields[11]) + int(fields[12])
+            previous = self.previous_ticks.get(pid)
+            self.previous_ticks[pid] = ticks
+            cpu = (ticks - previous) * scale if previous is not None else 0.0
+            name = head.partition(b"(")[2].decode(errors="replace")
+            results.append((cpu, int(fields[21]) * self.page_size, pid, name, fields[0].decode()))
+        return results
+
+
+class FileWatcher:
+    """Wait for changes to files and directories without polling.
+
+    On Linux the kernel's inotify queue is used through ctypes, so an idle
+    watch costs nothing until something changes. Elsewhere (or when inotify
+    is unavailable or out of watches) paths are re-scanned every
+    WATCH_POLL_INTERVAL seconds and the differences are reported with the
+    same event masks. wait() coalesces a burst of events into one batch of
+    {(path, name): mask}, where name is "" for events on the path itself.
+    """
+
+    MODIFY = 0x2
+    ATTRIB = 0x4
+    CLOSE_WRITE = 0x8
+    MOVED_FROM = 0x40
+    MOVED_TO = 0x80
+    CREATE = 0x100
+    DELETE = 0x200
+    DELETE_SELF = 0x400
+    MOVE_SELF = 0x800
+    OVERFLOW = 0x4000
+    IGNORED = 0x8000
+    FILE_EVENTS = MODIFY | ATTRIB | CLOSE_WRITE | DELETE_SELF | MOVE_SELF
+    DIR_EVENTS = FILE_EVENTS | MOVED_FROM | MOVED_TO | CREATE | DELETE
+    ROTATION_EVENTS = MOVED_FROM | MOVED_TO | CREATE | DELETE
+    LABELS = ((CREATE, "created"), (MOVED_TO, "moved in"), (MODIFY | CLOSE_WRITE, "modified"),
+              (ATTRIB, "attributes"), (MOVED_FROM, "moved out"), (DELETE, "deleted"),
+              (DELETE_SELF, "removed"), (MOVE_SELF, "moved"), (OVERFLOW, "events lost"))
+
+    def __init__(self, force_polling=False):
+        self.fd = None
+        self.libc = None
+        self.watches = {}  # inotify: wd -> path; polling: path -> (mask, snapshot)
+        if not force_polling and sys.platform.startswith("linux"):
+            try:
+                import ctypes
+                libc = ctypes.CDLL(None, use_errno=True)
+                fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+            except (OSError, AttributeError):
+                fd = -1
+            if fd >= 0:
+                self.fd = fd
+                self.libc = libc
+
+    @property
+    def backend(self):
+        return "inotify" if self.fd is not None else "polling"
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+        self.watches.clear()
+
+    def add(self, path, mask):
+        """Start watching a path; returns a handle for remove()"""
+        if self.fd is not None:
+            import ctypes
+            import errno
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+            if wd >= 0:
+                self.watches[wd] = path
+                return wd
+            error = ctypes.get_errno()
+            if error != errno.ENOSPC or self.watches:
+                raise OSError(error, os.strerror(error), path)
+            # Out of inotify watches system-wide: fall back to scanning
+            self.close()
+        self.watches[path] = (mask, self.snapshot(path))
+        return path
+
+    def remove(self, handle):
+        if self.watches.pop(handle, None) is not None and self.fd is not None:
+            self.libc.inotify_rm_watch(self.fd, handle)
+
+    def wait(self, timeout=None):
+        """Block until something changes, then return the coalesced burst"""
+        import select
+        deadline = None if timeout is None else time.monotonic() + timeout
+        events = {}
+        burst_end = None
+        while True:
+            now = time.monotonic()
+            if events:
+                quiet = min(WATCH_COALESCE, burst_end - now)
+                if quiet <= 0:
+                    return events
+            elif deadline is not None and now >= deadline:
+                return events
+            else:
+                quiet = None if deadline is None else deadline - now
+            if self.fd is not None:
+                ready = select.select([self.fd], [], [], quiet)[0]
+                found = self.read_events() if ready else {}
+            else:
+                time.sleep(WATCH_POLL_INTERVAL if quiet is None else min(quiet, WATCH_POLL_INTERVAL))
+                found = self.scan()
+            if not found:
+                if events:
+                    return events
+                continue
+            if not events:
+                burst_end = time.monotonic() + WATCH_COALESCE_MAX
+            for key, mask in found.items():
+                events[key] = events.get(key, 0) | mask
+
+    def read_events(self):
+        """Drain the inotify queue into {(path, name): mask}"""
+        import struct
+        events = {}
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return events
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = struct.unpack_from("iIII", data, offset)
+                name = data[offset + 16:offset + 16 + length].rstrip(b"\0")
+                offset += 16 + length
+                if mask & self.OVERFLOW:
+                    key = ("", "")
+                elif mask & self.IGNORED:
+                    self.watches.pop(wd, None)
+                    continue
+                elif wd in self.watches:
+                    key = (self.watches[wd], os.fsdecode(name))
+                else:
+                    continue
+                events[key] = events.get(key, 0) | mask
+
+    def snapshot(self, path):
+        """Stat a path (and its entries if it is a directory) for scan()"""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        entries = {"": (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns, st.st_mode)}
+        if stat.S_ISDIR(st.st_mode):
+            try:
+                with os.scandir(path) as it:
+                    for entry in it:
+                        try:
+                            est = entry.stat(follow_symlinks=False)
+                        except OSError:
+                            continue
+                        entries[entry.name] = (est.st_dev, est.st_ino, est.st_size, est.st_mtime_ns, est.st_mode)
+            except OSError:
+                pass
+        return entries
+
+    def scan(self):
+        """Polling backend: compare fresh snapshots with the previous ones"""
+        events = {}
+        for path, (mask, before) in list(self.watches.items()):
+            after = self.snapshot(path)
+            self.watches[path] = (mask, after)
+            if before == after:
+                continue
+            if after is None or before is None or before[""][:2] != after[""][:2]:
+                events[(path, "")] = self.DELETE_SELF if after is None else self.MOVE_SELF
+                continue
+            for name in before.keys() | after.keys():
+                old, new = before.get(name), after.get(name)
+                if old == new or (not name and stat.S_ISDIR(new[4])):
+                    continue
+                if old is None:
+                    found = self.CREATE
+                elif new is None:
+                    found = self.DELETE
+                elif old[:2] != new[:2]:
+                    found = self.DELETE | self.CREATE
+                elif old[2:4] != new[2:4]:
+                    found = self.MODIFY
+                else:
+                    found = self.ATTRIB
+                if found & mask:
+                    events[(path, name)] = found & mask
+        return events
+
+    @classmethod
+    def describe(cls, mask):
+        """Turn an event mask into labels such as: created, modified"""
+        return ", ".join(label for bits, label in cls.LABELS if mask & bits) or "changed"
+
+
+class DataStore:
+    """SQLite-backed store for notes, todos and persistent caches, opened on first use.
+
+    Entries are addressed by their stable row id, so lookups and status
+    updates go through the primary key index instead of scanning.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS notes (
+            id INTEGER PRIMARY KEY,
+            text TEXT NOT NULL,
+            timestamp TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS todos (
+            id INTEGER PRIMARY KEY,
+            task TEXT NOT NULL,
+            timestamp TEXT NOT NULL,
+            done INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE TABLE IF NOT EXISTS du_cache (
+            dev INTEGER NOT NULL,
+            ino INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            size INTEGER NOT NULL,
+            subdirs TEXT NOT NULL,
+            PRIMARY KEY (dev, ino)
+        );
+        CREATE TABLE IF NOT EXISTS hash_cache (
+            dev INTEGER NOT NULL,
+            ino INTEGER NOT NULL,
+            algorithm TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            digest TEXT NOT NULL,
+            PRIMARY KEY (dev, ino, algorithm)
+        );
+    """
+
+    # Columns added after the first release, applied to older databases on open
+    MIGRATIONS = [
+        ("todos", "due", "ALTER TABLE todos ADD COLUMN due REAL"),
+        ("todos", "priority", "ALTER TABLE todos ADD COLUMN priority INTEGER NOT NULL DEFAULT 2"),
+        ("todos", "reminded", "ALTER TABLE todos ADD COLUMN reminded INTEGER NOT NULL DEFAULT 0"),
+    ]
+
+    INDEXES = """
+        CREATE INDEX IF NOT EXISTS todos_open ON todos (done, id);
+        CREATE INDEX IF NOT EXISTS todos_due ON todos (done, due);
+    """
+
+    def __init__(self, path, threaded=False):
+        self.path = path
+        self.threaded = threaded  # used from several threads, one at a time (server sessions)
+        self._db = None
+
+    @property
+    def db(self):
+        if self._db is None:
+            import sqlite3
+            self._db = sqlite3.connect(self.path, isolation_level=None, check_same_thread=not self.threaded)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.executescript(self.SCHEMA)
+            self._migrate()
+            self._db.executescript(self.INDEXES)
+        return self._db
+
+    def _migrate(self):
+        for table, column, statement in self.MIGRATIONS:
+            columns = [row[1] for row in self._db.execute(f"PRAGMA table_info({table})")]
+            if column not in columns:
+                self._db.execute(statement)
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def add_note(self, text, timestamp):
+        return self.db.execute("INSERT INTO notes (text, timestamp) VALUES (?, ?)", (text, timestamp)).lastrowid
+
+    def add_todo(self, task, timestamp, due=None, priority=PRIORITIES["normal"]):
+        return self.db.execute("INSERT INTO todos (task, timestamp, due, priority) VALUES (?, ?, ?, ?)",
+                               (task, timestamp, due, priority)).lastrowid
+
+    def mark_reminded(self, todo_id):
+        self.db.execute("UPDATE todos SET reminded = 1 WHERE id = ?", (todo_id,))
+
+    def pending_reminders(self):
+        """Iterate (due, priority, id) for open todos whose reminder has not fired"""
+        return self.db.execute("SELECT due, priority, id FROM todos WHERE done = 0 AND due IS NOT NULL AND reminded = 0")
+
+    def todos_by_due(self, before=None, page=None, page_size=PAGE_SIZE):
+        """Iterate open todos with a due date, soonest first, from the due index"""
+        query = "SELECT id, done, task, timestamp, due, priority FROM todos WHERE done = 0 AND due IS NOT NULL"
+        params = ()
+        if before is not None:
+            query += " AND due < ?"
+            params = (before,)
+        query += " ORDER BY due, priority DESC" + self._limit(page, page_size)
+        return self.db.execute(query, params)
+
+    def mark_done(self, todo_id):
+        """Mark a todo as done, returning False if no such todo exists"""
+        return self.db.execute("UPDATE todos SET done = 1 WHERE id = ?", (todo_id,)).rowcount > 0
+
+    def count_notes(self):
+        return self.db.execute("SELECT COUNT(*) FROM notes").fetchone()[0]
+
+    def count_todos(self, open_only=False):
+        where = " WHERE done = 0" if open_only else ""
+        return self.db.execute(f"SELECT COUNT(*) FROM todos{where}").fetchone()[0]
+
+    def has_notes(self):
+        return self.db.execute("SELECT EXISTS (SELECT 1 FROM notes)").fetchone()[0] == 1
+
+    def has_todos(self, open_only=False):
+        where = " WHERE done = 0" if open_only else ""
+        return self.db.execute(f"SELECT EXISTS (SELECT 1 FROM todos{where})").fetchone()[0] == 1
+
+    def get_note(self, note_id):
+        return self.db.execute("SELECT id, timestamp, text FROM notes WHERE id = ?", (note_id,)).fetchone()
+
+    def get_todo(self, todo_id):
+        return self.db.execute("SELECT id, done, task, timestamp, due, priority FROM todos WHERE id = ?",
+                               (todo_id,)).fetchone()
+
+    def notes(self, page=None, page_size=PAGE_SIZE):
+        """Iterate (id, timestamp, text) rows, optionally one page at a time"""
+        return self.db.execute("SELECT id, timestamp, text FROM notes ORDER BY id" + self._limit(page, page_size))
+
+    def todos(self, page=None, page_size=PAGE_SIZE, open_only=False):
+        """Iterate (id, done, task, timestamp, due, priority) rows, optionally one page at a time"""
+        where = " WHERE done = 0" if open_only else ""
+        return self.db.execute("SELECT id, done, task, timestamp, due, priority FROM todos" + where + " ORDER BY id"
+                               + self._limit(page, page_size))
+
+    def du_lookup(self, dev, ino):
+        """Return (mtime_ns, size of files, [subdirectory names]) cached for a directory"""
+        row = self.db.execute("SELECT mtime_ns, size, subdirs FROM du_cache WHERE dev = ? AND ino = ?",
+                              (dev, ino)).fetchone()
+        if row is None:
+            return None
+        return row[0], row[1], row[2].split("\0") if row[2] else []
+
+    def du_store(self, rows):
+        """Save (dev, ino, mtime_ns, size, [subdirectory names]) rows in one transaction"""
+        with self.db:
+            self.db.execute("BEGIN")
+            self.db.executemany("INSERT OR REPLACE INTO du_cache VALUES (?, ?, ?, ?, ?)",
+                                [(dev, ino, mtime, size, "\0".join(subdirs)) for dev, ino, mtime, size, subdirs in rows])
+
+    def hash_lookup(self, st, algorithm):
+        """Return the cached digest for a file if its size and mtime still match"""
+        row = self.db.execute("SELECT digest FROM hash_cache WHERE dev = ? AND ino = ? AND algorithm = ? "
+                              "AND size = ? AND mtime_ns = ?",
+                              (st.st_dev, st.st_ino, algorithm, st.st_size, st.st_mtime_ns)).fetchone()
+        return row[0] if row else None
+
+    def hash_store(self, rows):
+        """Save (stat result, algorithm, digest) rows in one transaction"""
+        with self.db:
+            self.db.execute("BEGIN")
+            self.db.executemany("INSERT OR REPLACE INTO hash_cache VALUES (?, ?, ?, ?, ?, ?)",
+                                [(st.st_dev, st.st_ino, algorithm, st.st_size, st.st_mtime_ns, digest)
+                                 for st, algorithm, digest in rows])
+
+    def _limit(self, page, page_size):
+        if page is None:
+            return ""
+        return f" LIMIT {int(page_size)} OFFSET {(int(page) - 1) * int(page_size)}"
+
+
+class ReminderScheduler:
+    """Min-heap of pending todo reminders ordered by due time, then priority.
+
+    Only the top of the heap is looked at between prompts, so the per-prompt
+    cost does not depend on how many todos are scheduled. Entries for todos
+    finished in the meantime are dropped when they reach the top.
+    """
+
+    def __init__(self):
+        self.heap = []
+        self.loaded = False
+
+    def load(self, rows):
+        import heapq
+        self.heap = [(due, -priority, todo_id) for due, priority, todo_id in rows]
+        heapq.heapify(self.heap)
+        self.loaded = True
+
+    def add(self, due, priority, todo_id):
+        import heapq
+        if self.loaded:
+            heapq.heappush(self.heap, (due, -priority, todo_id))
+
+    def pop_due(self, now):
+        """Pop and return the ids of every reminder due at or before now"""
+        import heapq
+        due_ids = []
+        while self.heap and self.heap[0][0] <= now:
+            due_ids.append(heapq.heappop(self.heap)[2])
+        return due_ids
+
+
+class Calculator:
+    """Safe expression evaluator for calc.
+
+    Expressions are parsed, checked against a whitelist of AST nodes and
+    compiled once; the code objects are kept in an LRU keyed by source text.
+    Range evaluation uses NumPy when it is installed and falls back to a loop
+    over the compiled code otherwise.
+    """
+
+    FUNCTIONS = {
+        # name: (math/builtin implementation, numpy ufunc name)
+        "sin": ("sin", "sin"), "cos": ("cos", "cos"), "tan": ("tan", "tan"),
+        "asin": ("asin", "arcsin"), "acos": ("acos", "arccos"), "atan": ("atan", "arctan"),
+        "atan2": ("atan2", "arctan2"), "sinh": ("sinh", "sinh"), "cosh": ("cosh", "cosh"),
+        "tanh": ("tanh", "tanh"), "sqrt": ("sqrt", "sqrt"), "exp": ("exp", "exp"),
+        "log": ("log", "log"), "log10": ("log10", "log10"), "log2": ("log2", "log2"),
+        "floor": ("floor", "floor"), "ceil": ("ceil", "ceil"), "hypot": ("hypot", "hypot"),
+        "degrees": ("degrees", "degrees"), "radians": ("radians", "radians"),
+        "abs": ("abs", "abs"), "round": ("round", "round"), "min": ("min", "minimum"),
+        "max": ("max", "maximum"), "pow": ("pow", "power"), "factorial": ("factorial", None),
+    }
+    CONSTANTS = ("pi", "e", "tau", "inf")
+    MAX_RESULT_BITS = 1000000  # integer results beyond this would take too long to compute or print
+
+    def __init__(self, max_cached=256):
+        self.max_cached = max_cached
+        self.cache = OrderedDict()  # source -> code object
+        self.variables = {}
+        self._scalar_namespace = None
+
+    def compile(self, source):
+        """Validate and compile an expression, reusing earlier compilations"""
+        code = self.cache.get(source)
+        if code is not None:
+            self.cache.move_to_end(source)
+            return code
+        import ast
+        tree = ast.parse(source.strip(), mode="eval")
+        allowed = (ast.Expression, ast.BinOp, ast.UnaryOp, ast.BoolOp, ast.Compare, ast.IfExp,
+                   ast.Call, ast.Name, ast.Load, ast.Constant, ast.operator, ast.unaryop,
+                   ast.boolop, ast.cmpop)
+        for node in ast.walk(tree):
+            if not isinstance(node, allowed) or isinstance(node, (ast.MatMult, ast.LShift, ast.RShift)):
+                raise ValueError(f"unsupported syntax: {type(node).__name__}")
+            if isinstance(node, ast.Constant) and not isinstance(node.value, (int, float, complex)):
+                raise ValueError("only numeric constants are allowed")
+            if isinstance(node, ast.Name) and node.id.startswith("_"):
+                raise ValueError(f"invalid name: {node.id}")
+            if isinstance(node, ast.Call):
+                if not isinstance(node.func, ast.Name) or node.func.id not in self.FUNCTIONS or node.keywords:
+                    raise ValueError("only calls to math functions are allowed")
+        tree = self._guard_powers(ast, tree)
+        code = compile(tree, "<calc>", "eval")
+        self.cache[source] = code
+        if len(self.cache) > self.max_cached:
+            self.cache.popitem(last=False)
+        return code
+
+    def _guard_powers(self, ast, tree):
+        """Route ** through _pow so huge results can't hang the shell"""
+        class PowerGuard(ast.NodeTransformer):
+            def visit_BinOp(self, node):
+                self.generic_visit(node)
+                if isinstance(node.op, ast.Pow):
+                    return ast.copy_location(ast.Call(ast.Name("_pow", ast.Load()), [node.left, node.right], []), node)
+                return node
+        return ast.fix_missing_locations(PowerGuard().visit(tree))
+
+    @classmethod
+    def _pow(cls, base, exponent):
+        # Bound the size of the result, not just the exponent: (9**9999)**9999
+        # has a small exponent but a base that is already 31,700 bits long
+        if isinstance(base, int) and abs(base) > 1 and isinstance(exponent, (int, float)) and \
+                base.bit_length() * abs(exponent) > cls.MAX_RESULT_BITS:
+            raise ValueError("result too large")
+        return base ** exponent
+
+    @classmethod
+    def _factorial(cls, n):
+        import math
+        if isinstance(n, float) and n.is_integer():
+            n = int(n)
+        if isinstance(n, int) and n * n.bit_length() > cls.MAX_RESULT_BITS:
+            raise ValueError("factorial argument too large")
+        return math.factorial(n)
+
+    def scalar_namespace(self):
+        if self._scalar_namespace is None:
+            import builtins
+            import math
+            namespace = {name: getattr(math, name) for name in self.CONSTANTS}
+            for name, (impl, _) in self.FUNCTIONS.items():
+                namespace[name] = getattr(math, impl, None) or getattr(builtins, impl)
+            namespace["factorial"] = self._factorial
+            namespace["_pow"] = self._pow
+            namespace["__builtins__"] = {}
+            self._scalar_namespace = namespace
+        return self._scalar_namespace
+
+    def evaluate(self, source):
+        return eval(self.compile(source), self.scalar_namespace(), dict(self.variables))
+
+    def assign(self, name, source):
+        if name in self.FUNCTIONS or name in self.CONSTANTS or name.startswith("_"):
+            raise ValueError(f"cannot assign to {name}")
+        value = self.evaluate(source)
+        self.variables[name] = value
+        return value
+
+    def evaluate_range(self, source, name, start, stop, step=1.0):
+        """Evaluate source for name = start, start + step, ... up to stop (inclusive)"""
+        if step == 0 or (stop - start) / step < 0:
+            raise ValueError("empty range")
+        count = int((stop - start) / step + 1e-9) + 1
+        if count > MAX_CALC_POINTS:
+            raise ValueError(f"range too large (max {MAX_CALC_POINTS} points)")
+        code = self.compile(source)
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+        if numpy is not None:
+            namespace = {name: self.scalar_namespace()[name] for name in self.CONSTANTS}
+            for fname, (impl, ufunc) in self.FUNCTIONS.items():
+                namespace[fname] = getattr(numpy, ufunc) if ufunc else numpy.vectorize(self.scalar_namespace()[fname])
+            namespace["_pow"] = numpy.power
+            namespace["__builtins__"] = {}
+            local = dict(self.variables)
+            local[name] = start + step * numpy.arange(count, dtype=float)
+            try:
+                values = eval(code, namespace, local)
+                return numpy.broadcast_to(numpy.asarray(values, dtype=float), (count,))
+            except (TypeError, ValueError):
+                pass  # e.g. "a if x > 0 else b" needs per-element evaluation
+        namespace = self.scalar_namespace()
+        local = dict(self.variables)
+        values = []
+        for i in range(count):
+            local[name] = start + step * i
+            values.append(float(eval(code, namespace, local)))
+        return values
+
+
+class Job:
+    """A command started in the background with '&'"""
+
+    def __init__(self, job_id, command, threaded):
+        self.id = job_id
+        self.command = command
+        self.threaded = threaded
+        self.started = time.monotonic()
+        self.finished = None
+        self.future = None
+        self.progress = ""
+
+    @property
+    def state(self):
+        if not self.future.done():
+            return "Running"
+        if self.future.cancelled():
+            return "Killed"
+        if self.future.exception() is not None:
+            return "Failed"
+        return "Done"
+
+    def elapsed(self):
+        return (self.finished or time.monotonic()) - self.started
+
+    def describe(self):
+        line = f"[{self.id}] {self.state:<8} {self.elapsed():7.1f}s  {self.command}"
+        if self.state == "Failed":
+            line += f" ({self.future.exception()})"
+        return line
+
+
+class JobManager:
+    """Runs background jobs on an asyncio event loop hosted in a helper thread.
+
+    Jobs with a native coroutine (like countdown) run on the loop itself;
+    other commands run in the loop's default thread pool. Either way the
+    interactive prompt keeps reading input while jobs make progress.
+    """
+
+    def __init__(self):
+        import asyncio
+        import threading
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="pyos-jobs", daemon=True)
+        self.thread.start()
+        self.jobs = OrderedDict()
+        self.next_id = 1
+
+    def submit(self, command, coroutine_factory, threaded=False):
+        """Start coroutine_factory(job) on the loop and return the Job"""
+        import asyncio
+        job = Job(self.next_id, command, threaded)
+        self.next_id += 1
+
+        async def runner():
+            try:
+                return await coroutine_factory(job)
+            finally:
+                job.finished = time.monotonic()
+
+        job.future = asyncio.run_coroutine_threadsafe(runner(), self.loop)
+        self.jobs[job.id] = job
+        return job
+
+    async def in_thread(self, function, *args):
+        """Await a blocking function in the loop's thread pool, keeping the caller's context"""
+        import asyncio
+        return await asyncio.to_thread(function, *args)
+
+    def kill(self, job):
+        job.future.cancel()
+        if job.finished is None:
+            job.finished = time.monotonic()
+
+    def collect_finished(self):
+        """Remove and return jobs that have finished since the last call"""
+        finished = [job for job in self.jobs.values() if job.future.done()]
+        for job in finished:
+            del self.jobs[job.id]
+        return finished
+
+    def shutdown(self):
+        """Cancel every task on the loop and let them unwind before stopping it"""
+        import asyncio
+        import concurrent.futures
+
+        async def cancel_all():
+            tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        try:
+            asyncio.run_coroutine_threadsafe(cancel_all(), self.loop).result(timeout=1)
+        except concurrent.futures.TimeoutError:
+            pass
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=1)
+        if not self.thread.is_alive():
+            self.loop.close()
+
+
+class SearchIndex:
+    """In-memory inverted index over notes and todos.
+
+    Documents are keyed by ("note", id) or ("todo", id). Terms are kept in a
+    sorted list next to the postings so prefix queries are a bisect away.
+    """
+
+    def __init__(self):
+        self.postings = {}  # term -> {doc: term frequency}
+        self.terms = []  # sorted list of every term in postings
+        self.lengths = {}  # doc -> number of terms
+        self.lock = NullLock()  # server mode swaps in a real lock for its sessions
+
+    @staticmethod
+    def tokenize(text):
+        import re
+        return re.findall(r"\w+", text.lower())
+
+    def add(self, doc, text):
+        import bisect
+        tokens = self.tokenize(text)
+        with self.lock:
+            for term in self.index(doc, tokens):
+                bisect.insort(self.terms, term)
+
+    def add_many(self, documents):
+        """Index (doc, text) pairs in bulk, sorting the vocabulary once at the end"""
+        with self.lock:
+            for doc, text in documents:
+                self.index(doc, self.tokenize(text))
+            self.terms = sorted(self.postings)
+
+    def index(self, doc, tokens):
+        """Record a document's tokens (lock held) and return the terms new to the index"""
+        new_terms = []
+        self.lengths[doc] = len(tokens)
+        for token in tokens:
+            docs = self.postings.get(token)
+            if docs is None:
+                docs = self.postings[token] = {}
+                new_terms.append(token)
+            docs[doc] = docs.get(doc, 0) + 1
+        return new_terms
+
+    def lookup(self, term):
+        """Return {doc: tf} for a term; a trailing '*' matches by prefix"""
+        if not term.endswith("*"):
+            return self.postings.get(term, {})
+        import bisect
+        import itertools
+        prefix = term[:-1]
+        merged = {}
+        start = bisect.bisect_left(self.terms, prefix)
+        for token in itertools.islice(self.terms, start, None):
+            if not token.startswith(prefix):
+                break
+            for doc, tf in self.postings[token].items():
+                merged[doc] = merged.get(doc, 0) + tf
+        return merged
+
+    def search(self, query, limit=20):
+        """Run an AND/OR query and return [(score, doc)] best first.
+
+        Terms are ANDed together; the OR keyword separates alternatives.
+        """
+        clauses = [[]]
+        for word in query.split():
+            if word == "OR":
+                clauses.append([])
+                continue
+            tokens = self.tokenize(word)
+            if word.endswith("*") and tokens:
+                tokens[-1] += "*"
+            clauses[-1].extend(tokens)
+
+        with self.lock:
+            return self.score(clauses, limit)
+
+    def score(self, clauses, limit):
+        """Rank the documents matching any clause by summed tf-idf"""
+        import heapq
+        import math
+        total = len(self.lengths) or 1
+        scores = {}
+        for clause in clauses:
+            if not clause:
+                continue
+            postings = sorted((self.lookup(term) for term in clause), key=len)
+            matches = set(postings[0])
+            for docs in postings[1:]:
+                matches.intersection_update(docs)
+                if not matches:
+                    break
+            for docs in postings:
+                idf = math.log(1 + total / (len(docs) or 1))
+                for doc in matches:
+                    score = docs[doc] * idf / math.sqrt(self.lengths[doc] or 1)
+                    scores[doc] = scores.get(doc, 0.0) + score
+        return heapq.nlargest(limit, ((score, doc) for doc, score in scores.items()))
+
+
+# Search workers for find and grep. They live at module level so that
+# process pools can pickle them; each returns (output lines, error lines).
+
+def parse_size(text):
+    """Parse a size like 512, 10k, 5M or 2G into bytes"""
+    units = {"k": 1024, "m": 1024 ** 2, "g": 1024 ** 3, "t": 1024 ** 4}
+    multiplier = units.get(text[-1:].lower(), 1)
+    return int(float(text[:-1] if multiplier > 1 else text) * multiplier)
+
+
+def find_test(path, name, is_dir, criteria):
+    """Check one filesystem entry against find criteria"""
+    import fnmatch
+    if "type" in criteria and criteria["type"] != ("d" if is_dir else "f"):
+        return False
+    if "name" in criteria and not fnmatch.fnmatchcase(name, criteria["name"]):
+        return False
+    if "iname" in criteria and not fnmatch.fnmatchcase(name.lower(), criteria["iname"].lower()):
+        return False
+    if "size" in criteria or "mtime" in criteria:
+        st = os.lstat(path)
+        for key, value in (("size", st.st_size), ("mtime", (time.time() - st.st_mtime) / 86400)):
+            if key not in criteria:
+                continue
+            op, limit = criteria[key]
+            if op == "+" and not value > limit:
+                return False
+            if op == "-" and not value < limit:
+                return False
+            if op == "=" and not (value == limit if key == "size" else limit <= value < limit + 1):
+                return False
+    return True
+
+
+def find_worker(kind, paths, criteria):
+    """Test paths (kind "files") or walk whole subtrees (kind "trees") for find"""
+    found = []
+    errors = []
+    pending = []
+    for path in paths:
+        try:
+            is_dir = os.path.isdir(path) and not os.path.islink(path)
+            if find_test(path, os.path.basename(path), is_dir, criteria):
+                found.append(path)
+        except OSError as e:
+            errors.append(f"find: {path}: {e.strerror}")
+            continue
+        if kind == "trees" and is_dir:
+            pending.append(path)
+    while pending:
+        directory = pending.pop()
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                    if find_test(entry.path, entry.name, is_dir, criteria):
+                        found.append(entry.path)
+                    if is_dir:
+                        pending.append(entry.path)
+        except OSError as e:
+            errors.append(f"find: {directory}: {e.strerror}")
+    return found, errors
+
+
+def count_newlines(mm, start, end):
+    """Count newlines in mm[start:end] without copying the whole range"""
+    total = 0
+    for offset in range(start, end, CHUNK_SIZE):
+        total += mm[offset:min(offset + CHUNK_SIZE, end)].count(b"\n")
+    return total
+
+
+def grep_file(path, regex, options):
+    """Search one file through an mmap with a compiled bytes regex"""
+    import mmap
+    label = f"{path}:" if options.get("prefix") else ""
+    results = []
+    try:
+        with open(path, "rb") as f:
+            if b"\0" in f.read(8192):
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    if regex.search(mm) is not None:
+                        results.append(path if options.get("names") else f"Binary file {path} matches")
+                return results, []
+            if os.fstat(f.fileno()).st_size == 0:
+                return results, []
+            if options.get("invert"):
+                f.seek(0)
+                for number, line in enumerate(f, 1):
+                    if regex.search(line) is None:
+                        if options.get("names"):
+                            return [path], []
+                        text = line.rstrip(b"\r\n").decode(errors="replace")
+                        results.append(f"{label}{number}:{text}" if options.get("numbers") else f"{label}{text}")
+                return results, []
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                size = len(mm)
+                line_start = -1
+                number, counted = 1, 0
+                for match in regex.finditer(mm):
+                    start = mm.rfind(b"\n", 0, match.start()) + 1
+                    if start == line_start:
+                        continue
+                    if options.get("names"):
+                        return [path], []
+                    line_start = start
+                    end = mm.find(b"\n", match.end())
+                    end = size if end < 0 else end
+                    text = mm[start:end].rstrip(b"\r").decode(errors="replace")
+                    if options.get("numbers"):
+                        number += count_newlines(mm, counted, start)
+                        counted = start
+                        results.append(f"{label}{number}:{text}")
+                    else:
+                        results.append(f"{label}{text}")
+        return results, []
+    except (OSError, ValueError) as e:
+        return [], [f"grep: {path}: {getattr(e, 'strerror', None) or e}"]
+
+
+def grep_worker(kind, paths, search):
+    """Search files (kind "files") or whole subtrees (kind "trees") for grep"""
+    regex, options = search
+    results = []
+    errors = []
+    pending = []
+    for path in paths:
+        if os.path.isdir(path) and not os.path.islink(path):
+            if kind == "trees":
+                pending.append(path)
+        else:
+            found, failed = grep_file(path, regex, options)
+            results.extend(found)
+            errors.extend(failed)
+    while pending:
+        directory = pending.pop()
+        try:
+            with os.scandir(directory) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError as e:
+            errors.append(f"grep: {directory}: {e.strerror}")
+            continue
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                pending.append(entry.path)
+            elif entry.is_file(follow_symlinks=False):
+                found, failed = grep_file(entry.path, regex, options)
+                results.extend(found)
+                errors.extend(failed)
+    return results, errors
+
+
+# Copy helpers for cp and mv; copy_files runs on a thread pool for tree copies.
+
+def copy_data(source_fd, target_fd, progress=None):
+    """Copy everything from source_fd to target_fd (both at offset 0); returns the byte count.
+
+    Tries os.copy_file_range, which copies inside the kernel (or shares
+    extents on filesystems with reflinks), then os.sendfile, then a plain
+    read/write loop with a large buffer. Each step hands over to the next
+    when the OS or filesystem does not support it.
+    """
+    import errno
+    copied = 0
+    for method in ("copy_file_range", "sendfile"):
+        function = getattr(os, method, None)
+        if function is None:
+            continue
+        try:
+            while True:
+                if method == "copy_file_range":
+                    count = function(source_fd, target_fd, COPY_CHUNK)
+                else:
+                    count = function(target_fd, source_fd, copied, COPY_CHUNK)
+                if count == 0:
+                    if copied:
+                        return copied
+                    break  # some files (like /proc) claim to be empty here; let read() decide
+                copied += count
+                if progress is not None:
+                    progress(copied)
+        except OSError as e:
+            if e.errno in (errno.ENOSPC, errno.EIO, getattr(errno, "EDQUOT", errno.ENOSPC)):
+                raise
+        os.lseek(source_fd, copied, os.SEEK_SET)
+        os.lseek(target_fd, copied, os.SEEK_SET)
+
+    while True:
+        data = os.read(source_fd, CHUNK_SIZE)
+        if not data:
+            return copied
+        view = memoryview(data)
+        while view:
+            view = view[os.write(target_fd, view):]
+        copied += len(data)
+        if progress is not None:
+            progress(copied)
+
+
+def copy_file(source, target, times=False, progress=None):
+    """Copy a file's data and permissions (and timestamps if times); returns the byte count"""
+    with open(source, "rb") as src:
+        st = os.fstat(src.fileno())
+        with open(target, "wb") as dst:
+            try:
+                copied = copy_data(src.fileno(), dst.fileno(), progress)
+            except BaseException:
+                # Only a target this call truncated is removed, never one it failed to open
+                try:
+                    os.unlink(target)
+                except OSError:
+                    pass
+                raise
+    os.chmod(target, stat.S_IMODE(st.st_mode))
+    if times:
+        os.utime(target, ns=(st.st_atime_ns, st.st_mtime_ns))
+    return copied
+
+
+def hash_file(path, algorithm):
+    """Hash a file in large chunks and return the hex digest.
+
+    hashlib releases the GIL for large updates, so many files can be hashed
+    at once on a thread pool.
+    """
+    import hashlib
+    digest = hashlib.new(algorithm)
+    buffer = bytearray(CHUNK_SIZE)
+    view = memoryview(buffer)
+    with open(path, "rb", buffering=0) as f:
+        while True:
+            count = f.readinto(buffer)
+            if not count:
+                return digest.hexdigest()
+            digest.update(view[:count])
+
+
+def copy_files(pairs, times=False):
+    """Copy a batch of (source, target) files; returns (count, bytes, error messages)"""
+    count = size = 0
+    errors = []
+    for source, target in pairs:
+        try:
+            size += copy_file(source, target, times)
+            count += 1
+        except OSError as e:
+            errors.append(f"{source}: {e.strerror}")
+    return count, size, errors
+
+
+class ParallelGzipWriter:
+    """Write-only file object that gzips fixed-size blocks on a thread pool.
+
+    Every block becomes a complete gzip member. Readers of .gz files (gzip,
+    tar, Python's gzip module) treat concatenated members as one stream, so
+    the result is an ordinary .gz file. zlib releases the GIL while it
+    compresses, so the threads use every core. At most two blocks per worker
+    are in flight, which bounds memory whatever the size of the input.
+    """
+
+    def __init__(self, fileobj, level=6, block_size=ARCHIVE_BLOCK, workers=CPU_WORKERS, progress=None):
+        import concurrent.futures
+        self.fileobj = fileobj
+        self.level = level
+        self.block_size = block_size
+        self.progress = progress
+        self.executor = concurrent.futures.ThreadPoolExecutor(workers)
+        self.limit = workers * 2
+        self.pending = deque()
+        self.buffer = bytearray()
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def write(self, data):
+        self.buffer += data
+        self.bytes_in += len(data)
+        while len(self.buffer) >= self.block_size:
+            self.submit(bytes(self.buffer[:self.block_size]))
+            del self.buffer[:self.block_size]
+        return len(data)
+
+    def submit(self, block):
+        import gzip
+        self.pending.append(self.executor.submit(gzip.compress, block, self.level, mtime=0))
+        while len(self.pending) > self.limit:
+            self.write_block(self.pending.popleft())
+        if self.progress is not None:
+            self.progress()
+
+    def write_block(self, future):
+        data = future.result()
+        self.fileobj.write(data)
+        self.bytes_out += len(data)
+
+    def close(self):
+        """Compress what is left and write every block out, in order"""
+        if self.buffer:
+            self.submit(bytes(self.buffer))
+            self.buffer = bytearray()
+        while self.pending:
+            self.write_block(self.pending.popleft())
+        self.executor.shutdown()
+
+    def abort(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        self.pending.clear()
+
+
+def encode_frame(kind, text):
+    """Frame a server message: 1-byte kind, 4-byte big-endian length, UTF-8 payload"""
+    import struct
+    data = text.encode("utf-8", errors="replace")
+    return struct.pack("!cI", kind, len(data)) + data
+
+
+class SessionOutput:
+    """Text stream that sends a server session's output to its client as O frames.
+
+    Writes come from worker threads and block until the socket has drained,
+    so a slow client only holds up its own session.
+    """
+
+    def __init__(self, loop, writer, tty=False):
+        self.loop = loop
+        self.writer = writer
+        self.tty = tty
+
+    def write(self, text):
+        if text:
+            import asyncio
+            sending = self.send(b"O", text)
+            try:
+                future = asyncio.run_coroutine_threadsafe(sending, self.loop)
+            except RuntimeError:  # the server's loop has closed
+                sending.close()
+                raise ConnectionResetError("server shut down")
+            future.result()
+        return len(text)
+
+    async def send(self, kind, text):
+        if self.writer.is_closing():
+            raise ConnectionResetError("client disconnected")
+        self.writer.write(encode_frame(kind, text))
+        await self.writer.drain()
+
+    def flush(self):
+        pass
+
+    def isatty(self):
+        return self.tty
+
+
+class SessionServer:
+    """Serves many PyOS sessions from one long-lived process over a Unix socket.
+
+    Each connection gets a session from PyOS.new_session; the command registry,
+    directory cache, search index, process pool and configuration are shared.
+    Commands run on a thread pool so a slow command only holds up its own
+    session. The server sends frames (see encode_frame) of these kinds:
+    O output, S exit status of the last command, P prompt (ready for the next
+    line) and X session over, with the exit code.
+    """
+
+    def __init__(self, pyos, path, workers=IO_WORKERS):
+        self.pyos = pyos
+        self.path = path
+        self.workers = workers
+        self.executor = None
+        self.busy = set()  # worker threads in the middle of a command
+
+    def run(self):
+        """Serve until interrupted; returns an exit status"""
+        import asyncio
+        try:
+            asyncio.run(self.serve())
+        except KeyboardInterrupt:
+            pass
+        except OSError as e:
+            print(f"Cannot serve on {self.path}: {e.strerror or e}", file=sys.stderr)
+            return 1
+        if self.busy:
+            # Worker threads cannot be stopped; don't wait for them to finish on their own
+            print(f"Stopping with {len(self.busy)} command(s) still running", file=sys.stderr)
+            self.pyos.close()
+            sys.stderr.flush()
+            os._exit(0)
+        return 0
+
+    def prepare(self):
+        """Make the shared state safe to use from several sessions at once"""
+        pyos = self.pyos
+        pyos.interactive = False
+        pyos.config  # load once so that every session shares it
+        pyos.get_search_index()
+        pyos.share_caches()
+        pyos.get_process_pool()
+        sys.stdout = ContextOutput(sys.stdout)
+        sys.stderr = ContextOutput(sys.stderr)
+        # Commands that prompt (like device) must not read the server's terminal
+        sys.stdin = open(os.devnull)
+
+    def remove_stale_socket(self):
+        """Delete a socket file left behind by a server that is no longer running"""
+        import socket
+        if not os.path.exists(self.path):
+            return
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.path)
+        except OSError:
+            os.unlink(self.path)
+        else:
+            raise OSError(f"another server is listening on {self.path}")
+        finally:
+            probe.close()
+
+    async def serve(self):
+        import asyncio
+        import concurrent.futures
+        import signal
+        self.remove_stale_socket()
+        self.prepare()
+        self.executor = concurrent.futures.ThreadPoolExecutor(self.workers, thread_name_prefix="pyos-session")
+        stopping = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        loop.add_signal_handler(signal.SIGTERM, stopping.set)
+        loop.add_signal_handler(signal.SIGINT, stopping.set)
+        server = await asyncio.start_unix_server(self.handle, path=self.path)
+        try:
+            os.chmod(self.path, 0o600)  # sessions can run any command: owner only
+            print(f"Serving KisueerOS on {self.path} (Ctrl-C to stop)", file=sys.stderr)
+            async with server:
+                await stopping.wait()
+        finally:
+            server.close()
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def peer_name(self, writer):
+        """Login name of the connecting process, from the socket's peer credentials"""
+        try:
+            import pwd
+            import socket
+            import struct
+            sock = writer.get_extra_info("socket")
+            credentials = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+            return pwd.getpwuid(struct.unpack("3i", credentials)[1]).pw_name
+        except (ImportError, AttributeError, OSError, KeyError):
+            return None
+
+    async def handle(self, reader, writer):
+        """Run one client's session: a hello line, then one command per line"""
+        import asyncio
+        import json
+        loop = asyncio.get_running_loop()
+        session = None
+        try:
+            hello = json.loads(await reader.readline() or b"{}")
+            session = self.pyos.new_session(hello.get("cwd"), self.peer_name(writer))
+            output = SessionOutput(loop, writer, bool(hello.get("tty")))
+            stream = OutputWriter(output)
+            while session.running:
+                await output.send(b"P", session.prompt())
+                line = await reader.readline()
+                if not line:
+                    break
+                line = line.decode("utf-8", errors="replace").rstrip("\r\n")
+                await loop.run_in_executor(self.executor, self.run_command, session, stream, line)
+                await output.send(b"S", str(session.status))
+            await output.send(b"X", str(session.exit_code))
+        except (ConnectionError, ValueError):
+            pass  # client went away or did not speak the protocol
+        except asyncio.CancelledError:
+            pass  # server shutting down
+        finally:
+            if session is not None:
+                if session.jobs is not None:
+                    session.jobs.shutdown()
+                session.store.close()
+            writer.close()
+
+    def run_command(self, session, stream, line):
+        """Execute a line for a session on a worker thread, printing to its client"""
+        import threading
+        thread = threading.get_ident()
+        self.busy.add(thread)
+        stdout_token = sys.stdout.bind(stream)
+        stderr_token = sys.stderr.bind(stream)
+        try:
+            session.execute(line)
+            session.report_jobs()
+        except ConnectionError:
+            raise
+        except Exception as e:
+            print(f"Error: {e}")
+            session.status = 1
+        finally:
+            sys.stderr.unbind(stderr_token)
+            sys.stdout.unbind(stdout_token)
+            self.busy.discard(thread)
+        stream.flush()
+
+
 class PyOS:
+    DEFAULT_CONFIG = {
+        "theme": "default",
+        "prompt": "KisueerOS > ",
+        "welcome_message": "Welcome to KisueerOS! Type 'help' to see available commands."
+    }
+    FOLLOW_FLAGS = ("-f", "-F", "--follow")
+    # Commands whose arguments are patterns or paths, where quotes group words.
+    # Everything else (note, todo, echo, calc) keeps its text exactly as typed.
+    QUOTED_ARGS = frozenset(("find", "grep", "cp", "mv", "archive", "extract", "hash"))
+
     def __init__(self):
         self.running = True
-        self.username = os.getlogin()
+        self.interactive = True
+        self.status = 0
+        self.exit_code = 0
         self.current_dir = os.getcwd()
         self.commands = {}
-        self.notes = []
-        self.todos = []
+        self.dir_cache = DirectoryCache()
         self.config_file = "pyos_config.json"
-        self.config = {
-            "theme": "default",
-            "prompt": "KisueerOS > ",
-            "welcome_message": "Welcome to KisueerOS! Type 'help' to see available commands."
-        }
+        self.data_file = "pyos_data.db"
+        self.store = DataStore(self.data_file)
+        self.search_index = None  # built on the first search
+        self.scheduler = ReminderScheduler()
+        self.calculator = None  # created on the first calc
+        self.jobs = None  # started with the first background job
+        self.process_pool = None  # shared by find and grep, created on first use
+        self.timings = None  # command -> LatencyHistogram while 'stats on'
+        self.history_file = "pyos_history"
+        self.readline = None  # the readline module, once an interactive session sets it up
+        self.command_trie = None  # built on the first completion
+        self.completions = []
+
+        # The login name and configuration are looked up on first use
+        self._username = None
+        self._config = None
+        self._config_mtime = None
+        self._config_dirty = False
+        self._config_timer = None
         
         # Register all commands
         self.register_commands()
-        
-        # Load configuration if it exists
-        self.load_config()
+
+    @property
+    def username(self):
+        if self._username is None:
+            self._username = self.get_login_name()
+        return self._username
+
+    @username.setter
+    def username(self, value):
+        self._username = value
+
+    @property
+    def config(self):
+        if self._config is None:
+            self._config = dict(self.DEFAULT_CONFIG)
+            self.load_config()
+        return self._config
+
+    @config.setter
+    def config(self, value):
+        self._config = value
         
     def register_commands(self):
         # Basic commands
-        self.register_command("help", self.cmd_help, "Display help information for available commands")
-        self.register_command("exit", self.cmd_exit, "Exit KisueerOS")
-        self.register_command("clear", self.cmd_clear, "Clear the screen")
+        self.register_command("help", "cmd_help", "Display help information for available commands")
+        self.register_command("exit", "cmd_exit", "Exit KisueerOS (optionally with an exit code)")
+        self.register_command("clear", "cmd_clear", "Clear the screen")
         
         # System info commands
-        self.register_command("sysinfo", self.cmd_sysinfo, "Display system information")
-        self.register_command("time", self.cmd_time, "Display current time")
-        self.register_command("date", self.cmd_date, "Display current date")
+        self.register_command("sysinfo", "cmd_sysinfo", "Display system information")
+        self.register_command("du", "cmd_du", "Show disk usage per directory (-d DEPTH, --top N)")
+        self.register_command("monitor", "cmd_monitor", "Live CPU, memory and process monitor (-i SECONDS, -n COUNT)")
+        self.register_command("top", "cmd_monitor", "Alias for monitor")
+        self.register_command("time", "cmd_time", "Display current time, or time a command (time CMD)")
+        self.register_command("date", "cmd_date", "Display current date")
         
         # File system commands
-        self.register_command("ls", self.cmd_ls, "List files in current directory")
-        self.register_command("cd", self.cmd_cd, "Change directory")
-        self.register_command("pwd", self.cmd_pwd, "Print working directory")
-        self.register_command("mkdir", self.cmd_mkdir, "Create a new directory")
-        self.register_command("touch", self.cmd_touch, "Create a new empty file")
-        self.register_command("cat", self.cmd_cat, "Display content of a file")
-        self.register_command("rm", self.cmd_rm, "Remove file or directory")
+        self.register_command("ls", "cmd_ls", "List files in current directory")
+        self.register_command("cd", "cmd_cd", "Change directory")
+        self.register_command("pwd", "cmd_pwd", "Print working directory")
+        self.register_command("mkdir", "cmd_mkdir", "Create a new directory")
+        self.register_command("touch", "cmd_touch", "Create a new empty file")
+        self.register_command("cat", "cmd_cat", "Display content of a file", "stream_cat")
+        self.register_command("head", "cmd_head", "Display the first lines of a file", "stream_head")
+        self.register_command("tail", "cmd_tail", "Display the last lines of a file (-f to follow it)", "stream_tail")
+        self.register_command("watch", "cmd_watch", "Report changes in a directory or to a file until Ctrl-C")
+        self.register_command("rm", "cmd_rm", "Remove file or directory (-r, -f, --dry-run)")
+        self.register_command("cp", "cmd_cp", "Copy files or directories (-r)")
+        self.register_command("mv", "cmd_mv", "Move or rename files and directories")
+        self.register_command("archive", "cmd_archive", "Pack a file or directory into a .tar.gz (-l LEVEL)")
+        self.register_command("extract", "cmd_extract", "Unpack a tar archive into a directory")
+        self.register_command("hash", "cmd_hash", "Hash files or trees (-a ALGO, -o MANIFEST, --verify MANIFEST)")
         
+        # Text filter commands (for use in pipelines)
+        self.register_command("grep", "cmd_grep", "Search files or piped lines for a regular expression", "stream_grep")
+        self.register_command("find", "cmd_find", "Find files by name, type, size or age", "stream_find")
+        self.register_command("wc", "cmd_wc", "Count piped lines, words and characters", "stream_wc")
+
         # User commands
-        self.register_command("whoami", self.cmd_whoami, "Display current username")
-        self.register_command("setuser", self.cmd_setuser, "Change username")
+        self.register_command("whoami", "cmd_whoami", "Display current username")
+        self.register_command("setuser", "cmd_setuser", "Change username")
         
         # Fun commands
-        self.register_command("echo", self.cmd_echo, "Echo text back to the terminal")
-        self.register_command("fortune", self.cmd_fortune, "Get a random fortune")
-        self.register_command("flip", self.cmd_flip, "Flip a coin")
-        self.register_command("dice", self.cmd_dice, "Roll a dice (default: 6-sided)")
-        self.register_command("banner", self.cmd_banner, "Display a banner")
-        self.register_command("ddos", self.cmd_ddos, "DDOS an internet addres")
-        self.register_command("device", self.cmd_device, "Scan for devices around you and execute commands")
+        self.register_command("echo", "cmd_echo", "Echo text back to the terminal")
+        self.register_command("fortune", "cmd_fortune", "Get a random fortune")
+        self.register_command("flip", "cmd_flip", "Flip a coin")
+        self.register_command("dice", "cmd_dice", "Roll a dice (default: 6-sided)")
+        self.register_command("banner", "cmd_banner", "Display a banner")
+        self.register_command("ddos", "cmd_ddos", "DDOS an internet addres")
+        self.register_command("device", "cmd_device", "Scan for devices around you and execute commands")
         
         # Note and todo commands
-        self.register_command("note", self.cmd_note, "Add a note")
-        self.register_command("notes", self.cmd_notes, "List all notes")
-        self.register_command("todo", self.cmd_todo, "Add a todo item")
-        self.register_command("todos", self.cmd_todos, "List all todo items")
-        self.register_command("done", self.cmd_done, "Mark a todo item as done")
+        self.register_command("note", "cmd_note", "Add a note")
+        self.register_command("notes", "cmd_notes", "List notes (--page N)", "stream_notes")
+        self.register_command("todo", "cmd_todo", "Add a todo item (--due WHEN, --priority low|normal|high)")
+        self.register_command("todos", "cmd_todos", "List todo items (--open, --due, --overdue, --page N)", "stream_todos")
+        self.register_command("done", "cmd_done", "Mark a todo item as done")
+        self.register_command("search", "cmd_search", "Search notes and todos (AND, OR, prefix*)")
         
         # Configuration commands
-        self.register_command("theme", self.cmd_theme, "Change the theme")
-        self.register_command("setprompt", self.cmd_setprompt, "Change the prompt string")
-        self.register_command("config", self.cmd_config, "Display current configuration")
+        self.register_command("theme", "cmd_theme", "Change the theme")
+        self.register_command("setprompt", "cmd_setprompt", "Change the prompt string")
+        self.register_command("config", "cmd_config", "Display current configuration")
+        self.register_command("cache", "cmd_cache", "Show or clear the directory cache")
+        self.register_command("profile", "cmd_profile", "Run a command under cProfile and show the hotspots")
+        self.register_command("stats", "cmd_stats", "Per-command latency histograms (stats on|off|reset|CMD)")
         
+        # Job control commands
+        self.register_command("jobs", "cmd_jobs", "List background jobs (start one with 'command &')")
+        self.register_command("fg", "cmd_fg", "Wait for a background job in the foreground")
+        self.register_command("kill", "cmd_kill", "Stop a background job")
+
         # Advanced commands
-        self.register_command("calc", self.cmd_calc, "Simple calculator")
-        self.register_command("countdown", self.cmd_countdown, "Start a countdown timer")
-        self.register_command("weather", self.cmd_weather, "Display simulated weather")
+        self.register_command("calc", "cmd_calc", "Calculator with variables, math functions and ranges")
+        self.register_command("countdown", "cmd_countdown", "Start a countdown timer", background="async_countdown")
+        self.register_command("weather", "cmd_weather", "Display simulated weather")
         
-    def register_command(self, name, function, description):
-        """Register a new command"""
+    def get_login_name(self):
+        """Get the login name, even without a controlling terminal"""
+        import getpass
+        try:
+            return os.getlogin()
+        except OSError:
+            return getpass.getuser()
+
+    def register_command(self, name, function, description, stream=None, background=None):
+        """Register a new command
+
+        function, stream and background are method names (resolved on first
+        use) or callables. stream is an optional generator function taking
+        (args, lines) that yields output lines, so the command can take part
+        in pipelines. background is an optional coroutine function taking
+        (args, job) used when the command is started with '&'.
+        """
         self.commands[name] = {
             "function": function,
-            "description": description
+            "description": description,
+            "stream": stream,
+            "background": background
         }
+        self.command_trie = None
     
+    def close(self):
+        """Release resources held by the session"""
+        self.save_history()
+        if self.jobs is not None:
+            self.jobs.shutdown()
+        if self.process_pool is not None:
+            self.process_pool.shutdown(wait=False, cancel_futures=True)
+        self.flush_config()
+        self.store.close()
+
+    def new_session(self, current_dir=None, username=None):
+        """Create a session that shares this shell's registry, caches and pools.
+
+        The session gets its own working directory, user, exit status,
+        calculator variables, jobs, timings and database connection.
+        """
+        import copy
+        session = copy.copy(self)
+        session.running = True
+        session.interactive = False
+        session.status = 0
+        session.exit_code = 0
+        session.current_dir = current_dir if current_dir and os.path.isdir(current_dir) else self.current_dir
+        session._username = username or self.username
+        session.store = DataStore(self.data_file, threaded=True)
+        session.scheduler = ReminderScheduler()
+        session.calculator = None
+        session.jobs = None
+        session.timings = None
+        session.readline = None
+        session.completions = []
+        return session
+
+    def get_handler(self, name, kind="function"):
+        """Resolve a registered command handler to a callable"""
+        handler = self.commands[name][kind]
+        if isinstance(handler, str):
+            return getattr(self, handler)
+        return handler
+
     def load_config(self):
-        """Load configuration from file"""
+        """Load configuration from file, merged over the defaults"""
+        import json
         try:
-            if os.path.exists(self.config_file):
-                with open(self.config_file, 'r') as f:
-                    self.config = json.load(f)
+            st = os.stat(self.config_file)
+        except OSError:
+            return
+        try:
+            with open(self.config_file, 'r') as f:
+                loaded = json.load(f)
+            config = dict(self.DEFAULT_CONFIG)
+            config.update(loaded)
+            self.config = config
+            self._config_mtime = st.st_mtime_ns
         except Exception as e:
             print(f"Error loading configuration: {e}")
+
+    def refresh_config(self):
+        """Reload the configuration if the file changed on disk"""
+        if self._config is None or self._config_dirty:
+            return
+        try:
+            mtime = os.stat(self.config_file).st_mtime_ns
+        except OSError:
+            return
+        if mtime != self._config_mtime:
+            self.load_config()
     
     def save_config(self):
-        """Save configuration to file"""
+        """Schedule the configuration to be written in the background"""
+        import threading
+        self._config_dirty = True
+        if self._config_timer is None:
+            self._config_timer = threading.Timer(CONFIG_FLUSH_DELAY, self.flush_config)
+            self._config_timer.daemon = True
+            self._config_timer.start()
+
+    def config_mode(self):
+        """Permission bits for a rewritten config file: the old file's, or the umask default"""
+        try:
+            return stat.S_IMODE(os.stat(self.config_file).st_mode)
+        except OSError:
+            umask = os.umask(0)
+            os.umask(umask)
+            return 0o666 & ~umask
+
+    def flush_config(self):
+        """Write pending configuration changes atomically (temp file + rename)"""
+        timer, self._config_timer = self._config_timer, None
+        if timer is not None:
+            timer.cancel()
+        if not self._config_dirty:
+            return
+        import json
+        import tempfile
+        self._config_dirty = False
+        data = dict(self._config)
+        directory = os.path.dirname(os.path.abspath(self.config_file))
         try:
-            with open(self.config_file, 'w') as f:
-                json.dump(self.config, f, indent=4)
+            fd, tmp_path = tempfile.mkstemp(prefix=".pyos_config.", dir=directory)
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(data, f, indent=4)
+                    f.flush()
+                    os.fsync(f.fileno())
+                    # mkstemp creates the file 0600; keep the mode a plain open() would give
+                    os.fchmod(f.fileno(), self.config_mode())
+                os.replace(tmp_path, self.config_file)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+            self._config_mtime = os.stat(self.config_file).st_mtime_ns
         except Exception as e:
+            self._config_dirty = True
             print(f"Error saving configuration: {e}")
     
     def run(self):
         """Run the PyOS main loop"""
+        if os.name == "nt":
+            import colorama
+            colorama.just_fix_windows_console()
         print(self.config["welcome_message"])
+        self.setup_readline()
         
         while self.running:
             try:
-                user_input = input(f"{Colors.GREEN}┌──{Colors.BLUE}({self.username}㉿Kisueer{Colors.GREEN})-[{Fore.RESET}~{Colors.GREEN}]\n└─{Colors.BLUE}${Fore.RESET} ")
+                self.check_reminders()
+                self.report_jobs()
+                self.refresh_config()
+                user_input = input(self.prompt())
+                self.add_history(user_input)
                 self.parse_input(user_input)
             except KeyboardInterrupt:
                 print("\nUse 'exit' to quit PyOS.")
+            except EOFError:
+                print()
+                break
             except Exception as e:
                 print(f"Error: {e}")
-    
+
+    def prompt(self):
+        """Build the prompt, marking colour codes as zero-width for readline"""
+        prompt = f"{Colors.GREEN}┌──{Colors.BLUE}({self.username}㉿Kisueer{Colors.GREEN})-[{Colors.RESET}~{Colors.GREEN}]\n└─{Colors.BLUE}${Colors.RESET} "
+        if self.readline is not None:
+            prompt = readline_prompt(prompt)
+        return prompt
+
+    def setup_readline(self):
+        """Enable line editing, Ctrl-R history search and tab completion if readline is available"""
+        try:
+            import readline
+        except ImportError:
+            return
+        self.readline = readline
+        readline.set_history_length(HISTORY_SIZE)
+        readline.set_auto_history(False)
+        try:
+            readline.read_history_file(self.history_file)
+        except OSError:
+            pass
+        readline.set_completer_delims(" \t\n|;&")
+        readline.set_completer(self.complete)
+        if "libedit" in (readline.__doc__ or ""):
+            readline.parse_and_bind("bind ^I rl_complete")
+        else:
+            readline.parse_and_bind("tab: complete")
+
+    def add_history(self, line):
+        """Remember a command line, skipping blanks and immediate repeats"""
+        readline = self.readline
+        if readline is None or not line.strip():
+            return
+        length = readline.get_current_history_length()
+        if length and readline.get_history_item(length) == line:
+            return
+        readline.add_history(line)
+
+    def save_history(self):
+        """Write the last HISTORY_SIZE command lines back to the history file"""
+        if self.readline is None:
+            return
+        try:
+            self.readline.write_history_file(self.history_file)
+        except OSError as e:
+            print(f"Error saving history: {e}", file=sys.stderr)
+
+    def complete(self, text, state):
+        """readline completer: command names first on the line or after '|', paths elsewhere"""
+        if state == 0:
+            try:
+                before = self.readline.get_line_buffer()[:self.readline.get_begidx()]
+                if not before.strip() or before.rstrip().endswith("|"):
+                    if self.command_trie is None:
+                        self.command_trie = PrefixTrie((name, name) for name in self.commands)
+                    self.completions = sorted(self.command_trie.values(text.lower()))
+                else:
+                    self.completions = self.complete_path(text)
+            except Exception:
+                self.completions = []  # exceptions inside a completer are swallowed by readline anyway
+        if state < len(self.completions):
+            return self.completions[state]
+        return None
+
+    def check_reminders(self):
+        """Print reminders for todos that have come due since the last prompt"""
+        if not self.scheduler.loaded:
+            self.scheduler.load(self.store.pending_reminders())
+        due_ids = self.scheduler.pop_due(time.time())
+        shown = 0
+        for todo_id in due_ids:
+            todo = self.store.get_todo(todo_id)
+            if todo is None or todo[1]:
+                continue
+            self.store.mark_reminded(todo_id)
+            shown += 1
+            if shown <= MAX_REMINDERS_SHOWN:
+                print(Colors.colorize(f"Reminder: todo #{todo_id} {todo[2]} is due ({self.format_due(todo[4])})", Colors.YELLOW))
+        if shown > MAX_REMINDERS_SHOWN:
+            print(Colors.colorize(f"...and {shown - MAX_REMINDERS_SHOWN} more (see 'todos --overdue')", Colors.YELLOW))
+
+    def run_batch(self, lines, stop_on_error=False):
+        """Run commands without a prompt and return an exit status"""
+        self.interactive = False
+        status = 0
+        for line in lines:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                status = self.parse_input(line)
+            except KeyboardInterrupt:
+                return 130
+            except BrokenPipeError:
+                # The reader went away (e.g. piped into head): stop quietly
+                os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+                return 141
+            except Exception as e:
+                print(f"Error: {e}", file=sys.stderr)
+                status = 1
+            if not self.running:
+                return self.exit_code
+            if status and stop_on_error:
+                return status
+        return status
+
     def parse_input(self, user_input):
-        """Parse and execute user input"""
+        """Parse and execute user input, returning the command's exit status"""
+        output = sys.stdout
+        contextual = isinstance(output, ContextOutput)  # installed once background jobs exist
+        if isinstance(output.stream if contextual else output, OutputWriter):
+            return self.execute(user_input)
+        writer = OutputWriter(output.stream if contextual else output, self.pager_rows())
+        if contextual:
+            token = output.bind(writer)
+        else:
+            sys.stdout = writer
+        try:
+            return self.execute(user_input)
+        except PagerQuit:
+            return self.status
+        finally:
+            if contextual:
+                output.unbind(token)
+            elif sys.stdout is writer:
+                sys.stdout = writer.stream
+            writer.flush()
+
+    def pager_rows(self):
+        """Screen height to page at, or None when paging does not apply"""
+        if not self.interactive or not sys.stdout.isatty() or not sys.stdin.isatty():
+            return None
+        try:
+            return os.get_terminal_size(sys.stdout.fileno()).lines
+        except (OSError, ValueError):
+            return None
+
+    def unpaged(self):
+        """Turn the pager off for the running command (for full-screen output)"""
+        output = sys.stdout.stream if isinstance(sys.stdout, ContextOutput) else sys.stdout
+        if isinstance(output, OutputWriter):
+            output.flush()
+            output.pager_rows = None
+
+    def execute(self, user_input):
+        """Run a command line and return its exit status"""
+        self.status = 0
         if not user_input.strip():
-            return
-            
-        parts = user_input.split()
+            return self.status
+        stripped = user_input.rstrip()
+        if stripped.endswith("&") and not stripped.endswith("&&"):
+            self.start_job(stripped[:-1].strip())
+            return self.status
+        word, _, rest = user_input.strip().partition(" ")
+        if word in ("time", "profile") and rest.strip():
+            # Prefixes apply to the whole rest of the line, pipes and quotes included
+            if word == "time":
+                return self.time_line(rest.strip())
+            return self.profile_line(rest.strip())
+        if "|" in user_input or (("'" in user_input or '"' in user_input)
+                                 and word.lower() in self.QUOTED_ARGS):
+            stages = self.split_pipeline(user_input)
+            if len(stages) > 1:
+                name = " | ".join(stage[0].lower() for stage in stages if stage)
+                self.dispatch(name, self.run_pipeline, stages)
+                return self.status
+            parts = stages[0]
+            if not parts:
+                return self.status
+        else:
+            parts = user_input.split()
         command = parts[0].lower()
         args = parts[1:]
         
         if command in self.commands:
-            self.commands[command]["function"](args)
+            self.dispatch(command, self.get_handler(command), args)
         else:
-            print(f"Command not found: {command}")
+            self.fail(f"Command not found: {command}", 127)
             print("Type 'help' to see available commands.")
+        return self.status
+
+    def dispatch(self, name, function, args):
+        """Call a command handler, recording its wall and CPU time while stats are on"""
+        timings = self.timings
+        if timings is None:
+            return function(args)
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            return function(args)
+        finally:
+            histogram = timings.get(name)
+            if histogram is None:
+                histogram = timings[name] = LatencyHistogram()
+            histogram.record(time.perf_counter() - wall, time.process_time() - cpu)
+
+    def time_line(self, line):
+        """Run a command line and report its real, user and system time"""
+        before = os.times()
+        wall = time.perf_counter()
+        status = self.execute(line)
+        elapsed = time.perf_counter() - wall
+        after = os.times()
+        sys.stdout.flush()
+        print(f"\nreal {elapsed:.3f}s  user {after.user - before.user:.3f}s  "
+              f"sys {after.system - before.system:.3f}s", file=sys.stderr)
+        self.status = status
+        return status
+
+    def profile_line(self, line):
+        """Run a command line under cProfile and print the functions with the most own time"""
+        import cProfile
+        import pstats
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            status = self.execute(line)
+        finally:
+            profiler.disable()
+        print(f"\n=== Profile: {line} ===")
+        stats = pstats.Stats(profiler, stream=sys.stdout)
+        stats.strip_dirs().sort_stats("tottime").print_stats(PROFILE_TOP)
+        self.status = status
+        return status
+
+    def start_job(self, line):
+        """Run a command line as a background job"""
+        parts = line.split()
+        if not parts:
+            self.fail("Syntax error: nothing to run in the background")
+            return
+        command = parts[0].lower()
+        if command not in self.commands:
+            self.fail(f"Command not found: {command}", 127)
+            return
+        if self.jobs is None:
+            self.jobs = JobManager()
+            self.share_caches()
+
+        # A job prints to the real stream, never into the foreground command's
+        # writer (and its pager). Once the first job starts, stdout is routed
+        # per context so the foreground and each job see their own stream.
+        stream = sys.stdout.stream if isinstance(sys.stdout, ContextOutput) else sys.stdout
+        if isinstance(stream, OutputWriter):
+            stream = stream.stream
+        if not isinstance(sys.stdout, ContextOutput):
+            sys.stdout = ContextOutput(stream)
+
+        # Jobs also run on their own session, so a failing job can't set the
+        # foreground command's status (and stop an -e script on the wrong line)
+        session = self.new_session()
+        jobs = self.jobs
+        # The job's task and threads copy this context. An unbuffered writer of
+        # its own still strips colours when the real stream isn't a terminal.
+        token = sys.stdout.bind(OutputWriter(stream, buffer_size=1))
+        try:
+            if "|" not in line and self.commands[command]["background"] is not None:
+                handler = session.get_handler(command, "background")
+                job = jobs.submit(line, lambda job: handler(parts[1:], job))
+            elif "|" in line:
+                stages = session.split_pipeline(line)
+                job = jobs.submit(line, lambda job: jobs.in_thread(session.run_pipeline, stages), threaded=True)
+            else:
+                handler = session.get_handler(command)
+                job = jobs.submit(line, lambda job: jobs.in_thread(handler, parts[1:]), threaded=True)
+        finally:
+            sys.stdout.unbind(token)
+        job.future.add_done_callback(lambda future: session.store.close())
+        sys.stdout.write(f"[{job.id}] {line}\n")  # one write, so a fast job can't split the line
+
+    def report_jobs(self):
+        """Announce background jobs that finished since the last prompt"""
+        if self.jobs is not None:
+            for job in self.jobs.collect_finished():
+                print(job.describe())
+
+    def split_pipeline(self, user_input):
+        """Split a command line into pipeline stages, respecting quotes"""
+        import shlex
+        try:
+            lexer = shlex.shlex(user_input, posix=True, punctuation_chars="|")
+            lexer.whitespace_split = True
+            lexer.escape = ""  # keep backslashes, e.g. in Windows paths
+            tokens = list(lexer)
+        except ValueError:
+            # Unbalanced quotes (e.g. "don't"): fall back to plain splitting
+            return [stage.split() for stage in user_input.split("|")]
+        stages = [[]]
+        for token in tokens:
+            if token and set(token) == {"|"}:
+                stages.append([])
+            else:
+                stages[-1].append(token)
+        return stages
+
+    def run_pipeline(self, stages):
+        """Run a pipeline of commands as a chain of lazy line generators"""
+        for stage in stages:
+            if not stage:
+                self.fail("Syntax error: empty pipeline stage")
+                return
+            if stage[0].lower() not in self.commands:
+                self.fail(f"Command not found: {stage[0].lower()}", 127)
+                return
+
+        generators = []
+        lines = None
+        try:
+            for stage in stages:
+                name = stage[0].lower()
+                if self.commands[name]["stream"] is not None:
+                    lines = self.get_handler(name, "stream")(stage[1:], lines)
+                else:
+                    lines = self.capture_output(self.get_handler(name), stage[1:])
+                generators.append(lines)
+            if any(stage[0].lower() == "tail" and set(stage[1:]) & set(self.FOLLOW_FLAGS) for stage in stages):
+                self.write_lines(lines, batch_size=1)  # a followed file never ends: show lines as they arrive
+            else:
+                self.write_lines(lines)
+        finally:
+            # Closing from the tail end lets upstream stages release files early
+            for generator in reversed(generators):
+                generator.close()
+
+    def capture_output(self, function, args):
+        """Adapt a print-based command into a line generator"""
+        import contextlib
+        import io
+        buffer = io.StringIO()
+        if isinstance(sys.stdout, ContextOutput):
+            # Swapping sys.stdout would capture every session's output
+            token = sys.stdout.bind(buffer)
+            try:
+                function(args)
+            finally:
+                sys.stdout.unbind(token)
+        else:
+            with contextlib.redirect_stdout(buffer):
+                function(args)
+        buffer.seek(0)
+        yield from buffer
+
+    def write_lines(self, lines, batch_size=1024):
+        """Write an iterable of lines to stdout in batches"""
+        batch = []
+        last = "\n"
+        for line in lines:
+            batch.append(line)
+            if len(batch) >= batch_size:
+                sys.stdout.write("".join(batch))
+                last = batch[-1][-1:]
+                batch = []
+                if batch_size == 1:
+                    sys.stdout.flush()
+        if batch:
+            sys.stdout.write("".join(batch))
+            last = batch[-1][-1:]
+        if last != "\n":
+            sys.stdout.write("\n")
+        sys.stdout.flush()
+
+    def write_chunks(self, chunks):
+        """Write blocks of complete lines, flushing after each so results show up as they are found"""
+        for chunk in chunks:
+            if chunk:
+                sys.stdout.write(chunk)
+                sys.stdout.flush()
+
+    def parse_flags(self, args, value_flags=(), bool_flags=()):
+        """Split args into ({flag: value}, positional), or None on a bad flag"""
+        options = {}
+        positional = []
+        args = list(args)
+        while args:
+            arg = args.pop(0)
+            if arg in value_flags:
+                if not args:
+                    return None
+                options[arg] = args.pop(0)
+            elif arg in bool_flags:
+                options[arg] = True
+            elif arg.startswith("--"):
+                return None
+            else:
+                positional.append(arg)
+        return options, positional
+
+    def fail(self, message, status=1):
+        """Report an error and mark the current command as failed"""
+        print(message)
+        self.status = status
     
     def get_display_path(self):
         """Get a shortened display path for the prompt"""
@@ -164,7 +2464,7 @@ class PyOS:
             if cmd in self.commands:
                 print(f"{cmd}: {self.commands[cmd]['description']}")
             else:
-                print(f"Command not found: {cmd}")
+                self.fail(f"Command not found: {cmd}")
         else:
             # General help
             print("Available commands:")
@@ -174,15 +2474,23 @@ class PyOS:
     
     def cmd_exit(self, args):
         """Exit the shell"""
-        print("Exiting PyOS. Goodbye!")
+        if args and args[0].lstrip("-").isdigit():
+            self.exit_code = int(args[0])
+        if self.interactive:
+            print("Exiting PyOS. Goodbye!")
         self.running = False
     
     def cmd_clear(self, args):
         """Clear the screen"""
-        os.system('cls' if os.name == 'nt' else 'clear')
+        if os.name == 'nt':
+            os.system('cls')
+        else:
+            # Escape codes rather than running clear, so they reach server clients too
+            sys.stdout.write("\033[H\033[2J\033[3J")
     
     def cmd_sysinfo(self, args):
         """Display system information"""
+        import platform
         print("=== System Information ===")
         print(f"Python version: {sys.version}")
         print(f"Platform: {platform.platform()}")
@@ -198,6 +2506,246 @@ class PyOS:
             print(f"Disk total: {self.format_size(disk_size)}")
             print(f"Disk free: {self.format_size(disk_free)}")
     
+    def cmd_du(self, args):
+        """Show disk usage per directory"""
+        usage = "Usage: du [-d DEPTH] [--top N] [--no-cache] [directory]"
+        parsed = self.parse_flags(args, ("-d", "--top"), ("--no-cache",))
+        if parsed is None or len(parsed[1]) > 1 or \
+                not all(value.isdigit() for value in parsed[0].values() if value is not True):
+            self.fail(usage)
+            return
+        options, positional = parsed
+        display = positional[0] if positional else "."
+        root = os.path.normpath(self.resolve_path(display))
+        if not os.path.isdir(root):
+            self.fail(f"du: {display}: Not a directory")
+            return
+
+        try:
+            sizes, children, stats = self.measure_tree(root, "--no-cache" not in options)
+        except KeyboardInterrupt:
+            self.fail("du interrupted", 130)
+            return
+
+        # Fold subtree totals bottom-up: children always sort after their parent
+        totals = {}
+        for path in sorted(sizes, reverse=True):
+            totals[path] = sizes[path] + sum(totals[child] for child in children[path])
+
+        max_depth = int(options["-d"]) if "-d" in options else None
+        root_depth = root.count(os.sep) - (1 if root == os.sep else 0)
+        shown = [path for path in totals
+                 if max_depth is None or path.count(os.sep) - root_depth <= max_depth]
+        if "--top" in options:
+            shown = sorted((p for p in shown if p != root), key=lambda p: -totals[p])[:int(options["--top"])]
+        else:
+            shown.sort()
+            shown.remove(root)
+            shown.append(root)
+
+        lines = []
+        for path in shown:
+            lines.append(f"{self.format_size(totals[path]):>12}  {display + path[len(root):]}")
+        lines.append(f"Scanned {stats['scanned']} directories, {stats['cached']} from cache")
+        print("\n".join(lines))
+        if stats["errors"]:
+            self.fail(f"du: could not read {stats['errors']} directories")
+
+    def measure_tree(self, root, use_cache=True):
+        """Sum file sizes per directory with a concurrent scandir walk.
+
+        Directories whose (inode, mtime) match the persisted cache reuse their
+        stored totals and subdirectory list instead of being rescanned. A file
+        rewritten in place does not change its directory's mtime, so --no-cache
+        is there for a guaranteed full scan.
+        Returns ({dir: bytes in its files}, {dir: [subdirs]}, stats).
+        """
+        import concurrent.futures
+        sizes = {}
+        children = {}
+        stats = {"scanned": 0, "cached": 0, "errors": 0}
+        updates = []
+        meter = ProgressMeter()
+
+        def record(path, size, subdirs):
+            sizes[path] = size
+            children[path] = [os.path.join(path, name) for name in subdirs]
+            stack.extend(children[path])
+
+        stack = [root]
+        pending = {}
+        with concurrent.futures.ThreadPoolExecutor(IO_WORKERS) as executor:
+            try:
+                while stack or pending:
+                    while stack:
+                        path = stack.pop()
+                        try:
+                            st = os.lstat(path)
+                        except OSError:
+                            # The parent already lists this path, so it still needs an entry
+                            stats["errors"] += 1
+                            sizes[path], children[path] = 0, []
+                            continue
+                        cached = self.store.du_lookup(st.st_dev, st.st_ino) if use_cache else None
+                        if cached is not None and cached[0] == st.st_mtime_ns:
+                            stats["cached"] += 1
+                            record(path, cached[1], cached[2])
+                        else:
+                            future = executor.submit(self.scan_sizes, path)
+                            pending[future] = (path, st)
+                    if pending:
+                        done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                        for future in done:
+                            path, st = pending.pop(future)
+                            result = future.result()
+                            if result is None:
+                                stats["errors"] += 1
+                                sizes[path], children[path] = 0, []
+                                continue
+                            stats["scanned"] += 1
+                            record(path, *result)
+                            updates.append((st.st_dev, st.st_ino, st.st_mtime_ns, result[0], result[1]))
+                    meter.update(lambda: f"Scanned {stats['scanned']} directories ({stats['cached']} cached)")
+            except KeyboardInterrupt:
+                for future in pending:
+                    future.cancel()
+                raise
+            finally:
+                meter.clear()
+        if updates:
+            self.store.du_store(updates)
+        return sizes, children, stats
+
+    @staticmethod
+    def scan_sizes(path):
+        """Return (bytes in the directory's own files, [subdirectory names]) or None"""
+        size = 0
+        subdirs = []
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.name)
+                        else:
+                            size += entry.stat(follow_symlinks=False).st_size
+                    except OSError:
+                        pass
+        except OSError:
+            return None
+        return size, subdirs
+
+    def cmd_watch(self, args):
+        """Report changes in a directory (or to a single file) until Ctrl-C"""
+        if not args:
+            self.fail("Usage: watch <directory_or_file>")
+            return
+        display = " ".join(args)
+        path = os.path.normpath(self.resolve_path(display))
+        if not os.path.exists(path):
+            self.fail(f"Path not found: {display}")
+            return
+        is_dir = os.path.isdir(path)
+        watcher = FileWatcher()
+        self.unpaged()
+        try:
+            watcher.add(path, FileWatcher.DIR_EVENTS if is_dir else FileWatcher.FILE_EVENTS)
+            print(f"Watching {display} ({watcher.backend}); press Ctrl-C to stop")
+            sys.stdout.flush()
+            while True:
+                events = watcher.wait()
+                stamp = datetime.datetime.now().strftime("%H:%M:%S")
+                for (_, name), mask in sorted(events.items()):
+                    print(f"{stamp}  {FileWatcher.describe(mask):<24} {os.path.join(display, name) if name else display}")
+                sys.stdout.flush()
+                if events.get((path, ""), 0) & (FileWatcher.DELETE_SELF | FileWatcher.MOVE_SELF):
+                    print(f"{display} is gone; stopped watching")
+                    return
+        except KeyboardInterrupt:
+            pass
+        except OSError as e:
+            self.fail(f"watch: {e}")
+        finally:
+            watcher.close()
+
+    def cmd_monitor(self, args):
+        """Live CPU, memory and process monitor"""
+        usage = "Usage: monitor [-i SECONDS] [-n COUNT] [--top N]"
+        parsed = self.parse_flags(args, ("-i", "-n", "--top"))
+        if parsed is None or parsed[1]:
+            self.fail(usage)
+            return
+        options = parsed[0]
+        try:
+            interval = float(options.get("-i", 1))
+            count = int(options["-n"]) if "-n" in options else None
+            top = int(options.get("--top", 15))
+            if interval <= 0:
+                raise ValueError
+        except ValueError:
+            self.fail(usage)
+            return
+        if not os.path.exists("/proc/stat"):
+            self.fail("monitor needs the /proc filesystem (Linux)")
+            return
+
+        monitor = ProcMonitor()
+        tty = sys.stdout.isatty()
+        self.unpaged()
+        previous_frame = []
+        samples = 0
+        try:
+            monitor.system()
+            monitor.processes(0)
+            if tty:
+                sys.stdout.write("\033[2J")
+            while count is None or samples < count:
+                started = time.monotonic()
+                cpu_started = time.process_time()
+                time.sleep(interval)
+                frame = self.monitor_frame(monitor, interval, top)
+                samples += 1
+                overhead = (time.process_time() - cpu_started) / interval * 100
+                frame[0] += f"   (monitor: {overhead:.2f}% CPU)"
+                if tty:
+                    # Redraw only the lines that changed since the last frame
+                    out = []
+                    for row, line in enumerate(frame):
+                        if row >= len(previous_frame) or previous_frame[row] != line:
+                            out.append(f"\033[{row + 1};1H{line}\033[K")
+                    for row in range(len(frame), len(previous_frame)):
+                        out.append(f"\033[{row + 1};1H\033[K")
+                    out.append(f"\033[{len(frame) + 1};1H")
+                    sys.stdout.write("".join(out))
+                    sys.stdout.flush()
+                else:
+                    print("\n".join(frame) + "\n")
+                    sys.stdout.flush()
+                previous_frame = frame
+        except KeyboardInterrupt:
+            pass
+        finally:
+            monitor.close()
+        if tty:
+            print()
+
+    def monitor_frame(self, monitor, interval, top):
+        """Sample the system and format one monitor screen as a list of lines"""
+        cpu, mem_total, mem_available = monitor.system()
+        processes = monitor.processes(interval)
+        processes.sort(reverse=True)
+        used = mem_total - mem_available
+        percent = used / mem_total * 100 if mem_total else 0.0
+        lines = [
+            f"{time.strftime('%H:%M:%S')}  CPU {cpu:5.1f}%  {len(processes)} processes",
+            f"Memory: {self.format_size(used * 1024)} used of {self.format_size(mem_total * 1024)} ({percent:.1f}%)",
+            "",
+            f"{'PID':>7} {'S':1} {'CPU%':>6} {'RSS':>11}  NAME",
+        ]
+        for cpu_percent, rss, pid, name, state in processes[:top]:
+            lines.append(f"{pid:>7} {state:1} {cpu_percent:6.1f} {self.format_size(rss):>11}  {name}")
+        return lines
+
     def format_size(self, size_bytes):
         """Format bytes to human-readable size"""
         for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
@@ -207,7 +2755,11 @@ class PyOS:
         return f"{size_bytes:.2f} PB"
     
     def cmd_time(self, args):
-        """Display current time"""
+        """Display current time, or time a command"""
+        if args:
+            import shlex
+            self.time_line(shlex.join(args))
+            return
         print(f"Current time: {datetime.datetime.now().strftime('%H:%M:%S')}")
     
     def cmd_date(self, args):
@@ -216,26 +2768,101 @@ class PyOS:
     
     def cmd_ls(self, args):
         """List files in current directory"""
-        try:
-            path = " ".join(args) if args else self.current_dir
-            if not os.path.isabs(path):
-                path = os.path.join(self.current_dir, path)
-                
-            if os.path.isdir(path):
-                files = os.listdir(path)
-                for f in sorted(files):
-                    full_path = os.path.join(path, f)
-                    if os.path.isdir(full_path):
-                        print(f"\033[1;34m{f}/\033[0m")  # Blue for directories
-                    elif os.access(full_path, os.X_OK):
-                        print(f"\033[1;32m{f}*\033[0m")  # Green for executables
-                    else:
-                        print(f)
+        flags = set()
+        paths = []
+        for arg in args:
+            if arg.startswith("-") and len(arg) > 1 and not paths:
+                flags.update(arg[1:])
             else:
-                print(f"Not a directory: {path}")
+                paths.append(arg)
+        if flags - set("lRStr"):
+            self.fail("Usage: ls [-l] [-R] [-S | -t] [-r] [directory]")
+            return
+
+        try:
+            path = os.path.normpath(self.resolve_path(" ".join(paths) if paths else self.current_dir))
+            if not self.dir_cache.is_dir(path):
+                self.fail(f"Not a directory: {path}")
+                return
+
+            pending = [path]
+            first = True
+            while pending:
+                directory = pending.pop()
+                lines = []
+                if "R" in flags:
+                    if not first:
+                        lines.append("")
+                    lines.append(f"{directory}:")
+                first = False
+                try:
+                    listing = self.dir_cache.listing(directory, self.scan_directory, fresh=bool(flags & set("lSt")))
+                    entries = self.sort_entries(listing.values(), flags)
+                except OSError as e:
+                    lines.append(f"Cannot open directory {directory}: {e.strerror}")
+                    entries = []
+                for entry in entries:
+                    lines.append(self.format_entry(entry, "l" in flags))
+                sys.stdout.write("\n".join(lines) + "\n" if lines else "")
+                if "R" in flags:
+                    subdirs = [os.path.join(directory, e.name) for e in entries if e.is_dir and not e.is_link]
+                    pending.extend(reversed(subdirs))
+            sys.stdout.flush()
         except Exception as e:
-            print(f"Error: {e}")
-    
+            self.fail(f"Error: {e}")
+
+    def scan_directory(self, path):
+        """Read a directory with a single stat call per entry"""
+        entries = []
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    st = entry.stat()
+                except OSError:
+                    # Broken symlink: describe the link itself
+                    st = entry.stat(follow_symlinks=False)
+                entries.append(EntryInfo(entry.name, stat.S_ISDIR(st.st_mode), entry.is_symlink(),
+                                         st.st_mode, st.st_size, st.st_mtime))
+        return entries
+
+    def complete_path(self, text):
+        """Return path completions for text, served from the directory cache"""
+        directory, prefix = os.path.split(text)
+        base = os.path.normpath(self.resolve_path(directory or "."))
+        try:
+            names = self.dir_cache.completions(base, self.scan_directory, prefix)
+        except OSError:
+            return []
+        return sorted(os.path.join(directory, name) for name in names)
+
+    def sort_entries(self, entries, flags):
+        """Sort directory entries according to ls flags"""
+        if "S" in flags:
+            entries = sorted(entries, key=lambda e: (-e.size, e.name))
+        elif "t" in flags:
+            entries = sorted(entries, key=lambda e: (-e.mtime, e.name))
+        else:
+            entries = sorted(entries, key=lambda e: e.name)
+        if "r" in flags:
+            entries.reverse()
+        return entries
+
+    def format_entry(self, entry, long_format=False):
+        """Format a single directory entry for ls"""
+        if entry.is_dir:
+            name = f"\033[1;34m{entry.name}/\033[0m"  # Blue for directories
+        elif stat.S_ISREG(entry.mode) and entry.mode & 0o111:
+            name = f"\033[1;32m{entry.name}*\033[0m"  # Green for executables
+        else:
+            name = entry.name
+        if not long_format:
+            return name
+        mode = stat.filemode(entry.mode)
+        if entry.is_link:
+            mode = "l" + mode[1:]
+        mtime = time.strftime("%Y-%m-%d %H:%M", time.localtime(entry.mtime))
+        return f"{mode} {entry.size:>12} {mtime} {name}"
+
     def cmd_cd(self, args):
         """Change directory"""
         if not args:
@@ -251,10 +2878,10 @@ class PyOS:
             # Normalize path
             new_dir = os.path.normpath(new_dir)
             
-        if os.path.isdir(new_dir):
+        if self.dir_cache.is_dir(new_dir):
             self.current_dir = new_dir
         else:
-            print(f"Directory not found: {new_dir}")
+            self.fail(f"Directory not found: {new_dir}")
     
     def cmd_pwd(self, args):
         """Print working directory"""
@@ -263,7 +2890,7 @@ class PyOS:
     def cmd_mkdir(self, args):
         """Create a new directory"""
         if not args:
-            print("Usage: mkdir <directory_name>")
+            self.fail("Usage: mkdir <directory_name>")
             return
             
         dir_name = " ".join(args)
@@ -274,12 +2901,13 @@ class PyOS:
             os.makedirs(dir_name, exist_ok=True)
             print(f"Directory created: {dir_name}")
         except Exception as e:
-            print(f"Error creating directory: {e}")
+            self.fail(f"Error creating directory: {e}")
     
     def cmd_touch(self, args):
         """Create a new empty file"""
+        from pathlib import Path
         if not args:
-            print("Usage: touch <file_name>")
+            self.fail("Usage: touch <file_name>")
             return
             
         file_name = " ".join(args)
@@ -290,9 +2918,10 @@ class PyOS:
             Path(file_name).touch()
             print(f"File created: {file_name}")
         except Exception as e:
-            print(f"Error creating file: {e}")
+            self.fail(f"Error creating file: {e}")
 
     def cmd_ddos(self, args):
+        import random
         bot_count = random.randint(120, 240)
         banner = f"""
         {Colors.CYAN}╔══════════════════════════════════════════════════╗
@@ -308,44 +2937,1096 @@ class PyOS:
     
     def cmd_cat(self, args):
         """Display content of a file"""
+        usage = "Usage: cat [--head N | --tail N | --range START:END] <file_name>"
+        mode = None
+        value = None
+        while args and args[0] in ("--head", "--tail", "--range"):
+            if len(args) < 2:
+                self.fail(usage)
+                return
+            mode, value = args[0][2:], args[1]
+            args = args[2:]
         if not args:
-            print("Usage: cat <file_name>")
+            self.fail(usage)
             return
-            
-        file_name = " ".join(args)
-        if not os.path.isabs(file_name):
-            file_name = os.path.join(self.current_dir, file_name)
-            
+
+        file_name = self.resolve_path(" ".join(args))
         try:
-            if os.path.exists(file_name):
-                with open(file_name, 'r') as f:
-                    print(f.read())
+            if not os.path.exists(file_name):
+                self.fail(f"File not found: {file_name}")
+            elif mode == "head":
+                self.write_head(file_name, int(value))
+            elif mode == "tail":
+                self.write_tail(file_name, int(value))
+            elif mode == "range":
+                start, _, end = value.partition(":")
+                self.write_range(file_name, int(start or 0), int(end) if end else None)
             else:
-                print(f"File not found: {file_name}")
+                self.write_range(file_name)
+        except ValueError:
+            self.fail(usage)
         except Exception as e:
-            print(f"Error reading file: {e}")
-    
-    def cmd_rm(self, args):
-        """Remove file or directory"""
+            self.fail(f"Error reading file: {e}")
+
+    def stream_cat(self, args, lines):
+        """Yield the lines of a file, or pass piped lines through"""
         if not args:
-            print("Usage: rm <file_or_directory>")
+            if lines is not None:
+                yield from lines
+            else:
+                self.fail("Usage: cat <file_name>")
             return
-            
-        path = " ".join(args)
+        if args[0].startswith("--"):
+            yield from self.capture_output(self.cmd_cat, args)
+            return
+
+        file_name = self.resolve_path(" ".join(args))
+        try:
+            with open(file_name, "r", encoding="utf-8", errors="replace", newline="") as f:
+                yield from f
+        except FileNotFoundError:
+            self.fail(f"File not found: {file_name}")
+        except OSError as e:
+            self.fail(f"Error reading file: {e}")
+
+    def cmd_head(self, args):
+        """Display the first lines of a file"""
+        self.cmd_cat(["--head"] + self.parse_line_count(args))
+
+    def stream_head(self, args, lines):
+        """Yield the first lines of the piped input"""
+        import itertools
+        counted = self.parse_line_count(args, lines is not None)
+        if lines is None or len(counted) > 1:
+            yield from self.capture_output(self.cmd_head, args)
+        elif counted[0].isdigit():
+            yield from itertools.islice(lines, int(counted[0]))
+        else:
+            self.fail("Usage: head [-n N]")
+
+    def cmd_tail(self, args):
+        """Display the last lines of a file, or follow it with -f"""
+        follow = [arg for arg in args if arg in self.FOLLOW_FLAGS]
+        if not follow:
+            self.cmd_cat(["--tail"] + self.parse_line_count(args))
+            return
+        counted = self.parse_line_count([arg for arg in args if arg not in follow])
+        if len(counted) < 2 or not counted[0].isdigit():
+            self.fail("Usage: tail [-n N] -f <file_name>")
+            return
+        file_name = self.resolve_path(" ".join(counted[1:]))
+        self.unpaged()
+        try:
+            for text in self.follow_file(file_name, int(counted[0])):
+                sys.stdout.write(text)
+                sys.stdout.flush()
+        except KeyboardInterrupt:
+            pass
+        except FileNotFoundError:
+            self.fail(f"File not found: {file_name}")
+        except OSError as e:
+            self.fail(f"Error reading file: {e}")
+
+    def stream_tail(self, args, lines):
+        """Yield the last lines of the piped input, or of a followed file"""
+        if any(arg in self.FOLLOW_FLAGS for arg in args):
+            yield from self.stream_follow(args)
+            return
+        counted = self.parse_line_count(args, lines is not None)
+        if lines is None or len(counted) > 1:
+            yield from self.capture_output(self.cmd_tail, args)
+        elif counted[0].isdigit():
+            yield from deque(lines, maxlen=int(counted[0]))
+        else:
+            self.fail("Usage: tail [-n N]")
+
+    def stream_follow(self, args):
+        """Yield whole lines from tail -f until Ctrl-C, which ends the pipeline normally"""
+        counted = self.parse_line_count([arg for arg in args if arg not in self.FOLLOW_FLAGS])
+        if len(counted) < 2 or not counted[0].isdigit():
+            self.fail("Usage: tail [-n N] -f <file_name> | <command>")
+            return
+        file_name = self.resolve_path(" ".join(counted[1:]))
+        partial = ""
+        try:
+            for text in self.follow_file(file_name, int(counted[0])):
+                lines = (partial + text).splitlines(keepends=True)
+                partial = "" if lines[-1].endswith("\n") else lines.pop()
+                yield from lines
+        except KeyboardInterrupt:
+            pass
+        except FileNotFoundError:
+            self.fail(f"File not found: {file_name}")
+        except OSError as e:
+            self.fail(f"Error reading file: {e}")
+        if partial:
+            yield partial
+
+    def parse_line_count(self, args, piped=False):
+        """Turn head/tail style arguments into [count, file...]"""
+        if len(args) >= 2 and args[0] == "-n":
+            return args[1:]
+        if args and args[0].startswith("-") and args[0][1:].isdigit():
+            return [args[0][1:]] + args[1:]
+        if piped and len(args) == 1 and args[0].isdigit():
+            # "cat log | head 20": a bare number is the count
+            return args
+        return ["10"] + args
+
+    def cmd_grep(self, args):
+        """Search files or piped lines for a regular expression"""
+        self.write_chunks(self.stream_grep(args, None, chunked=True))
+
+    def stream_grep(self, args, lines, chunked=False):
+        """Yield the piped lines or file lines that match a pattern (file matches as one chunk per worker result when chunked)"""
+        import re
+        usage = "Usage: grep [-i] [-v] [-n] [-l] [-r] <pattern> [path...]  or  <command> | grep [-i] [-v] <pattern>"
+        flags = 0
+        options = {}
+        while args and len(args[0]) > 1 and args[0][0] == "-" and set(args[0][1:]) <= set("ivnlrR"):
+            for letter in args[0][1:]:
+                if letter == "i":
+                    flags |= re.IGNORECASE
+                else:
+                    options[{"v": "invert", "n": "numbers", "l": "names"}.get(letter, "recursive")] = True
+            args = args[1:]
+        if not args or (lines is None and len(args) < 2 and not options.get("recursive")):
+            self.fail(usage)
+            return
+
+        if lines is not None and not options.get("recursive"):
+            try:
+                search = re.compile(" ".join(args), flags).search
+            except re.error as e:
+                self.fail(f"Invalid pattern: {e}")
+                return
+            invert = options.get("invert", False)
+            for line in lines:
+                if (search(line) is None) == invert:
+                    yield line
+            return
+
+        try:
+            regex = re.compile(args[0].encode(), flags | re.MULTILINE)
+        except re.error as e:
+            self.fail(f"Invalid pattern: {e}")
+            return
+        paths = args[1:] or ["."]
+        options["prefix"] = options.get("recursive") or len(paths) > 1
+        for path in paths:
+            root = self.resolve_path(path)
+            if os.path.isdir(root) and not options.get("recursive"):
+                self.fail(f"grep: {path}: Is a directory (use -r)")
+                continue
+            if not os.path.lexists(root):
+                self.fail(f"grep: {path}: No such file or directory")
+                continue
+            for results in self.parallel_walk(root, path, grep_worker, (regex, options)):
+                if chunked:
+                    yield "".join(line + "\n" for line in results)
+                else:
+                    for line in results:
+                        yield line + "\n"
+
+    def cmd_find(self, args):
+        """Find files by name, type, size or age"""
+        self.write_chunks(self.stream_find(args, None, chunked=True))
+
+    def stream_find(self, args, lines, chunked=False):
+        """Yield paths under a directory that match find criteria (one chunk per worker result when chunked)"""
+        usage = "Usage: find [dir] [-name PATTERN] [-iname PATTERN] [-type f|d] [-size [+-]N[kMG]] [-mtime [+-]DAYS]"
+        parsed = self.parse_flags(args, ("-name", "-iname", "-type", "-size", "-mtime"))
+        if parsed is None or len(parsed[1]) > 1:
+            self.fail(usage)
+            return
+        options, positional = parsed
+        criteria = {}
+        try:
+            for key in ("name", "iname"):
+                if f"-{key}" in options:
+                    criteria[key] = options[f"-{key}"]
+            if "-type" in options:
+                if options["-type"] not in ("f", "d"):
+                    raise ValueError
+                criteria["type"] = options["-type"]
+            for key, parse in (("size", parse_size), ("mtime", float)):
+                value = options.get(f"-{key}")
+                if value is not None:
+                    op = value[0] if value[0] in "+-" else "="
+                    criteria[key] = (op, parse(value.lstrip("+-")))
+        except (ValueError, IndexError):
+            self.fail(usage)
+            return
+
+        display = positional[0] if positional else "."
+        root = self.resolve_path(display)
+        if not os.path.lexists(root):
+            self.fail(f"find: {display}: No such file or directory")
+            return
+        for results in self.parallel_walk(root, display, find_worker, criteria):
+            if chunked:
+                yield "".join(path + "\n" for path in results)
+            else:
+                for path in results:
+                    yield path + "\n"
+
+    def get_process_pool(self):
+        """Return the process pool shared by find and grep"""
+        if self.process_pool is None:
+            import concurrent.futures
+            import multiprocessing
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            self.process_pool = concurrent.futures.ProcessPoolExecutor(
+                CPU_WORKERS, mp_context=multiprocessing.get_context(method))
+        return self.process_pool
+
+    def parallel_walk(self, root, display, worker, argument):
+        """Yield result lists from worker(kind, paths, argument) over the tree at root.
+
+        The top of the tree is expanded here, breadth first, until there are
+        enough subtrees to keep every worker process busy; each subtree is
+        then walked by a single worker. Results are yielded as they arrive,
+        with root replaced by the path the user typed. Errors are printed.
+        """
+        import concurrent.futures
+        tasks = []
+        files = []
+        queue = deque([root])
+        target = CPU_WORKERS * 4
+        while queue and len(queue) < target:
+            directory = queue.popleft()
+            files.append(directory)
+            if not os.path.isdir(directory) or os.path.islink(directory):
+                continue
+            try:
+                with os.scandir(directory) as it:
+                    for entry in sorted(it, key=lambda e: e.name):
+                        if entry.is_dir(follow_symlinks=False):
+                            queue.append(entry.path)
+                        else:
+                            files.append(entry.path)
+            except OSError as e:
+                self.fail(f"{directory}: {e.strerror}")
+        for offset in range(0, len(files), WALK_BATCH):
+            tasks.append(("files", files[offset:offset + WALK_BATCH]))
+        tasks.extend(("trees", [directory]) for directory in queue)
+
+        def relabel(results, errors):
+            for message in errors:
+                self.fail(message.replace(root, display, 1))
+            return [display + path[len(root):] if path.startswith(root) else path for path in results]
+
+        if CPU_WORKERS <= 1 or len(tasks) <= 1:
+            for kind, paths in tasks:
+                yield relabel(*worker(kind, paths, argument))
+            return
+
+        futures = [self.get_process_pool().submit(worker, kind, paths, argument) for kind, paths in tasks]
+        try:
+            for future in concurrent.futures.as_completed(futures):
+                yield relabel(*future.result())
+        except concurrent.futures.process.BrokenProcessPool:
+            self.process_pool = None  # start a fresh pool next time
+            self.fail("Worker process pool failed; results are incomplete")
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def cmd_wc(self, args):
+        """Count piped lines, words and characters"""
+        self.write_lines(self.stream_wc(args, None))
+
+    def stream_wc(self, args, lines):
+        """Yield line, word and character counts of the piped input"""
+        if lines is None:
+            self.fail("Usage: <command> | wc [-l]")
+            return
+        line_count = word_count = char_count = 0
+        for line in lines:
+            line_count += 1
+            word_count += len(line.split())
+            char_count += len(line)
+        if args and args[0] == "-l":
+            yield f"{line_count}\n"
+        else:
+            yield f"{line_count} {word_count} {char_count}\n"
+
+    def resolve_path(self, path):
+        """Resolve a path relative to the current directory"""
         if not os.path.isabs(path):
             path = os.path.join(self.current_dir, path)
+        return path
+
+    def write_bytes(self, data, decoder=None):
+        """Write raw bytes to stdout, decoding them only when stdout has no byte buffer.
+
+        Pass the same decoder (from output_decoder) for every chunk of one
+        stream, so characters split across chunk boundaries survive.
+        """
+        out = getattr(sys.stdout, "buffer", None)
+        if out is None:
+            sys.stdout.write(decoder.decode(data) if decoder is not None else data.decode(errors="replace"))
+        else:
+            sys.stdout.flush()
+            out.write(data)
+
+    def output_decoder(self):
+        import codecs
+        return codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+    def finish_output(self, last_byte, decoder=None):
+        """Flush a partial character left in the decoder and make sure the prompt starts on a fresh line"""
+        if decoder is not None:
+            rest = decoder.decode(b"", final=True)
+            if rest:
+                sys.stdout.write(rest)
+        if last_byte not in (b"", b"\n"):
+            self.write_bytes(b"\n")
+        sys.stdout.flush()
+
+    def write_range(self, file_name, start=0, end=None):
+        """Stream a byte range of a file to stdout in fixed-size chunks"""
+        last = b""
+        decoder = self.output_decoder()
+        with open(file_name, "rb") as f:
+            if start < 0:
+                start = max(0, os.fstat(f.fileno()).st_size + start)
+            f.seek(start)
+            remaining = None if end is None else max(0, end - start)
+            while remaining is None or remaining > 0:
+                size = CHUNK_SIZE if remaining is None else min(CHUNK_SIZE, remaining)
+                chunk = f.read(size)
+                if not chunk:
+                    break
+                self.write_bytes(chunk, decoder)
+                last = chunk[-1:]
+                if remaining is not None:
+                    remaining -= len(chunk)
+        self.finish_output(last, decoder)
+
+    def write_head(self, file_name, count):
+        """Stream the first lines of a file, stopping as soon as they are written"""
+        last = b""
+        decoder = self.output_decoder()
+        with open(file_name, "rb") as f:
+            while count > 0:
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                pos = -1
+                while count > 0:
+                    pos = chunk.find(b"\n", pos + 1)
+                    if pos < 0:
+                        break
+                    count -= 1
+                if count == 0:
+                    chunk = chunk[:pos + 1]
+                self.write_bytes(chunk, decoder)
+                last = chunk[-1:]
+        self.finish_output(last, decoder)
+
+    def write_tail(self, file_name, count):
+        """Write the last lines of a file by scanning backwards through an mmap"""
+        decoder = self.output_decoder()
+        with open(file_name, "rb") as f:
+            if count <= 0:
+                return
+            start = self.tail_start(f, count)
+            if start is None:
+                # Empty or not mappable (pipes, procfs): keep only the last lines
+                lines = deque(f, maxlen=count)
+                self.write_bytes(b"".join(lines), decoder)
+                self.finish_output(lines[-1][-1:] if lines else b"", decoder)
+                return
+            f.seek(start)
+            last = b""
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                self.write_bytes(chunk, decoder)
+                last = chunk[-1:]
+            self.finish_output(last, decoder)
+
+    def tail_start(self, f, count):
+        """Offset where the last count lines of an open file begin, or None if it cannot be mapped"""
+        import mmap
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            return None
+        with mm:
+            size = len(mm)
+            pos = size - 1 if mm[size - 1:size] == b"\n" else size
+            for _ in range(count):
+                pos = mm.rfind(b"\n", 0, pos)
+                if pos < 0:
+                    break
+            return pos + 1
+
+    def follow_file(self, file_name, count):
+        """Yield the last lines of a file, then text as it is appended.
+
+        Only the bytes past the last offset are read after each change. The
+        name is followed like tail -F: when it is replaced by a new file
+        (log rotation) the rest of the old file is read first, and when it
+        is truncated reading restarts at the beginning.
+        """
+        decoder = self.output_decoder()
+        watcher = FileWatcher()
+        f = open(file_name, "rb")
+        try:
+            st = os.fstat(f.fileno())
+            position = st.st_size if count <= 0 else self.tail_start(f, count) or 0
+            # The directory catches the name being deleted, moved away or recreated
+            watcher.add(os.path.dirname(file_name), FileWatcher.ROTATION_EVENTS)
+            handle = watcher.add(file_name, FileWatcher.FILE_EVENTS)
+            while True:
+                f.seek(position)
+                for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                    position += len(chunk)
+                    text = decoder.decode(chunk)
+                    if text:
+                        yield text
+                try:
+                    current = os.stat(file_name)
+                except FileNotFoundError:
+                    current = None
+                if current is not None and (current.st_dev, current.st_ino) != (st.st_dev, st.st_ino):
+                    print(f"tail: {file_name} has been replaced; following the new file", file=sys.stderr)
+                    f.close()
+                    f = open(file_name, "rb")
+                    st = os.fstat(f.fileno())
+                    position = 0
+                    decoder.reset()
+                    watcher.remove(handle)
+                    handle = watcher.add(file_name, FileWatcher.FILE_EVENTS)
+                    continue
+                if current is not None and current.st_size < position:
+                    print(f"tail: {file_name}: file truncated", file=sys.stderr)
+                    position = 0
+                    decoder.reset()
+                    continue
+                watcher.wait()
+        finally:
+            watcher.close()
+            f.close()
+
+    def cmd_rm(self, args):
+        """Remove file or directory"""
+        usage = "Usage: rm [-r] [-f] [--dry-run] <file_or_directory>"
+        parsed = self.parse_flags(args, bool_flags=("-r", "-R", "-f", "-rf", "-fr", "--dry-run"))
+        if parsed is None or not parsed[1] or (parsed[1][0].startswith("-") and parsed[1][0] != "-"):
+            self.fail(usage)
+            return
+        options, words = parsed
+        force = any(flag in options for flag in ("-f", "-rf", "-fr"))
+        dry_run = "--dry-run" in options
             
+        path = self.resolve_path(" ".join(words))
+        try:
+            if os.path.isdir(path) and not os.path.islink(path):
+                result = self.remove_tree(path, dry_run)
+                self.report_removal(path, result, dry_run)
+            elif os.path.lexists(path):
+                if dry_run:
+                    print(f"Would remove file: {path}")
+                else:
+                    os.remove(path)
+                    print(f"File removed: {path}")
+            elif not force:
+                self.fail(f"No such file or directory: {path}")
+        except Exception as e:
+            self.fail(f"Error removing: {e}")
+
+    def remove_tree(self, root, dry_run=False):
+        """Delete a directory tree: scandir walk plus unlinks on a bounded thread pool.
+
+        Returns a dict of counts. Ctrl-C stops the walk, lets in-flight batches
+        finish and returns what was removed so far with "interrupted" set.
+        """
+        import concurrent.futures
+        result = {"files": 0, "dirs": 0, "bytes": 0, "errors": [], "error_count": 0, "interrupted": False}
+        meter = ProgressMeter()
+        executor = None if dry_run else concurrent.futures.ThreadPoolExecutor(IO_WORKERS)
+        pending = set()
+        directories = []
+
+        def collect(done):
+            for future in done:
+                files, size, errors = future.result()
+                result["files"] += files
+                result["bytes"] += size
+                self.record_errors(result, errors)
+
+        def progress():
+            rate = result["files"] / meter.elapsed()
+            verb = "Scanned" if dry_run else "Removed"
+            return f"{verb} {result['files']} files, {self.format_size(result['bytes'])} ({rate:.0f} files/s)"
+
+        try:
+            stack = [root]
+            while stack:
+                directory = stack.pop()
+                directories.append(directory)
+                batch = []
+                try:
+                    with os.scandir(directory) as it:
+                        for entry in it:
+                            if entry.is_dir(follow_symlinks=False):
+                                stack.append(entry.path)
+                            elif dry_run:
+                                result["files"] += 1
+                                result["bytes"] += entry.stat(follow_symlinks=False).st_size
+                            else:
+                                batch.append(entry.path)
+                                if len(batch) >= RM_BATCH:
+                                    pending.add(executor.submit(self.remove_files, batch))
+                                    batch = []
+                except OSError as e:
+                    self.record_errors(result, [f"{directory}: {e.strerror}"])
+                if batch:
+                    pending.add(executor.submit(self.remove_files, batch))
+                if len(pending) > IO_WORKERS * 4:
+                    done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                    collect(done)
+                meter.update(progress)
+
+            done, pending = concurrent.futures.wait(pending)
+            collect(done)
+            if dry_run:
+                result["dirs"] = len(directories)
+            else:
+                # Children were discovered after their parents, so reverse order empties bottom-up
+                for directory in reversed(directories):
+                    try:
+                        os.rmdir(directory)
+                        result["dirs"] += 1
+                    except OSError as e:
+                        self.record_errors(result, [f"{directory}: {e.strerror}"])
+                    meter.update(progress)
+        except KeyboardInterrupt:
+            result["interrupted"] = True
+            for future in pending:
+                future.cancel()
+            done, _ = concurrent.futures.wait(pending)
+            collect(f for f in done if not f.cancelled())
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True)
+            meter.clear()
+        result["seconds"] = meter.elapsed()
+        return result
+
+    @staticmethod
+    def remove_files(paths):
+        """Unlink a batch of files; returns (count, bytes, error messages)"""
+        count = size = 0
+        errors = []
+        for path in paths:
+            try:
+                length = os.lstat(path).st_size
+                os.unlink(path)
+                count += 1
+                size += length
+            except OSError as e:
+                errors.append(f"{path}: {e.strerror}")
+        return count, size, errors
+
+    def record_errors(self, result, errors, keep=5):
+        """Count errors, keeping only the first few messages"""
+        result["error_count"] += len(errors)
+        result["errors"].extend(errors[:max(0, keep - len(result["errors"]))])
+
+    def report_removal(self, path, result, dry_run):
+        """Print the summary of a tree removal"""
+        size = self.format_size(result["bytes"])
+        rate = result["files"] / result["seconds"]
+        if dry_run:
+            print(f"Would remove {result['files']} files and {result['dirs']} directories ({size}): {path}")
+        elif result["interrupted"]:
+            self.fail(f"rm interrupted: removed {result['files']} files ({size}) from {path}", 130)
+        elif result["error_count"] == 0:
+            print(f"Directory removed: {path} ({result['files']} files, {size} freed, {rate:.0f} files/s)")
+        for message in result["errors"]:
+            print(f"  {message}")
+        if result["error_count"]:
+            self.fail(f"Could not remove {result['error_count']} entries under {path}")
+
+    def cmd_cp(self, args):
+        """Copy files or directories"""
+        parsed = self.parse_flags(args, bool_flags=("-r", "-R"))
+        if parsed is None or len(parsed[1]) < 2 or any(word.startswith("-") for word in parsed[1]):
+            self.fail("Usage: cp [-r] <source>... <destination>")
+            return
+        options, words = parsed
+        self.transfer("cp", words[:-1], words[-1], recursive=bool(options))
+
+    def cmd_mv(self, args):
+        """Move or rename files and directories"""
+        if len(args) < 2 or any(arg.startswith("-") for arg in args):
+            self.fail("Usage: mv <source>... <destination>")
+            return
+        self.transfer("mv", args[:-1], args[-1])
+
+    def transfer(self, name, sources, destination, recursive=False):
+        """Copy or move each source to destination, or into it when it is a directory"""
+        destination = os.path.normpath(self.resolve_path(destination))
+        into = os.path.isdir(destination)
+        if len(sources) > 1 and not into:
+            self.fail(f"{name}: target '{destination}' is not a directory")
+            return
+        for source in sources:
+            source = os.path.normpath(self.resolve_path(source))
+            target = os.path.join(destination, os.path.basename(source)) if into else destination
+            try:
+                if name == "mv":
+                    self.move_path(source, target)
+                else:
+                    self.copy_path(source, target, recursive)
+            except KeyboardInterrupt:
+                self.fail(f"{name} interrupted: {source}", 130)
+                return
+            except OSError as e:
+                self.fail(f"{name}: cannot {'move' if name == 'mv' else 'copy'} '{source}': {e.strerror or e}")
+
+    def copy_path(self, source, target, recursive, times=False, verb="Copied"):
+        """Copy a file, or a directory tree when recursive; returns True on success"""
+        st = os.stat(source)
+        if stat.S_ISDIR(st.st_mode):
+            if not recursive:
+                self.fail(f"cp: omitting directory '{source}' (use -r)")
+                return False
+            if target == source or target.startswith(source.rstrip(os.sep) + os.sep):
+                self.fail(f"cp: cannot copy '{source}' into itself")
+                return False
+            result = self.copy_tree(source, target, times)
+        else:
+            if os.path.exists(target) and os.path.samefile(source, target):
+                self.fail(f"cp: '{source}' and '{target}' are the same file")
+                return False
+            meter = ProgressMeter()
+            try:
+                copied = copy_file(source, target, times,
+                                   lambda done: meter.update(lambda: self.copy_progress(1, done, meter, st.st_size)))
+            finally:
+                meter.clear()
+            result = {"files": 1, "dirs": 0, "bytes": copied, "errors": [], "error_count": 0,
+                      "interrupted": False, "seconds": meter.elapsed()}
+        return self.report_copy(source, target, result, verb)
+
+    def move_path(self, source, target):
+        """Rename source to target, copying and deleting when they are on different filesystems"""
+        import errno
+        os.lstat(source)
+        if target == source:
+            self.fail(f"mv: '{source}' and '{target}' are the same file")
+            return
+        try:
+            os.replace(source, target)
+            print(f"Moved: {source} -> {target}")
+            return
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+        if os.path.islink(source):
+            os.symlink(os.readlink(source), target)
+            os.unlink(source)
+            print(f"Moved: {source} -> {target}")
+        elif not self.copy_path(source, target, True, times=True, verb="Moved"):
+            print(f"Source kept: {source}")
+        elif os.path.isdir(source):
+            result = self.remove_tree(source)
+            if result["error_count"] or result["interrupted"]:
+                self.report_removal(source, result, False)
+        else:
+            os.unlink(source)
+
+    def copy_tree(self, root, target, times=False):
+        """Copy a directory tree: scandir walk plus file copies on a bounded thread pool.
+
+        Directories and symlinks are created here, in walk order; file batches
+        go to the pool. Directory permissions (and timestamps if times) are
+        applied last, so read-only directories can still be filled. Returns a
+        dict of counts like remove_tree.
+        """
+        import concurrent.futures
+        result = {"files": 0, "dirs": 0, "bytes": 0, "errors": [], "error_count": 0, "interrupted": False}
+        meter = ProgressMeter()
+        executor = concurrent.futures.ThreadPoolExecutor(IO_WORKERS)
+        pending = set()
+        directories = []
+
+        def collect(done):
+            for future in done:
+                files, size, errors = future.result()
+                result["files"] += files
+                result["bytes"] += size
+                self.record_errors(result, errors)
+
+        try:
+            stack = [(root, target)]
+            while stack:
+                source_dir, target_dir = stack.pop()
+                batch = []
+                try:
+                    st = os.stat(source_dir)
+                    os.makedirs(target_dir, exist_ok=True)
+                    directories.append((target_dir, st))
+                    with os.scandir(source_dir) as it:
+                        for entry in it:
+                            destination = os.path.join(target_dir, entry.name)
+                            if entry.is_dir(follow_symlinks=False):
+                                stack.append((entry.path, destination))
+                            elif entry.is_symlink():
+                                try:
+                                    os.symlink(os.readlink(entry.path), destination)
+                                    result["files"] += 1
+                                except OSError as e:
+                                    self.record_errors(result, [f"{entry.path}: {e.strerror}"])
+                            elif entry.is_file(follow_symlinks=False):
+                                batch.append((entry.path, destination))
+                                if len(batch) >= RM_BATCH:
+                                    pending.add(executor.submit(copy_files, batch, times))
+                                    batch = []
+                            else:
+                                self.record_errors(result, [f"{entry.path}: special file skipped"])
+                except OSError as e:
+                    self.record_errors(result, [f"{source_dir}: {e.strerror}"])
+                if batch:
+                    pending.add(executor.submit(copy_files, batch, times))
+                if len(pending) > IO_WORKERS * 4:
+                    done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                    collect(done)
+                meter.update(lambda: self.copy_progress(result["files"], result["bytes"], meter))
+
+            while pending:
+                done, pending = concurrent.futures.wait(pending, timeout=meter.interval)
+                collect(done)
+                meter.update(lambda: self.copy_progress(result["files"], result["bytes"], meter))
+            # Parents were found before their children, so reverse order finishes bottom-up
+            for target_dir, st in reversed(directories):
+                try:
+                    os.chmod(target_dir, stat.S_IMODE(st.st_mode))
+                    if times:
+                        os.utime(target_dir, ns=(st.st_atime_ns, st.st_mtime_ns))
+                except OSError as e:
+                    self.record_errors(result, [f"{target_dir}: {e.strerror}"])
+            result["dirs"] = len(directories)
+        except KeyboardInterrupt:
+            result["interrupted"] = True
+            for future in pending:
+                future.cancel()
+            done, _ = concurrent.futures.wait(pending)
+            collect(f for f in done if not f.cancelled())
+        finally:
+            executor.shutdown(wait=True)
+            meter.clear()
+        result["seconds"] = meter.elapsed()
+        return result
+
+    def cmd_archive(self, args):
+        """Pack a file or directory into a .tar.gz, compressing blocks in parallel"""
+        import tarfile
+        usage = "Usage: archive [-l LEVEL] <file_or_directory> <output.tar.gz>"
+        parsed = self.parse_flags(args, value_flags=("-l",))
+        if parsed is None or len(parsed[1]) != 2 or parsed[0].get("-l", "6") not in tuple("123456789"):
+            self.fail(usage)
+            return
+        level = int(parsed[0].get("-l", "6"))
+        source, output = (os.path.normpath(self.resolve_path(word)) for word in parsed[1])
+        if not os.path.exists(source):
+            self.fail(f"archive: no such file or directory: {source}")
+            return
+
+        # Write next to the output and rename when complete, so a failed run
+        # never harms an existing archive. Never pack the archive into itself.
+        partial = output + ".tmp"
+        base = os.path.basename(source)
+        skip = ({os.path.join(base, os.path.relpath(path, source)) for path in (output, partial)}
+                if output.startswith(source + os.sep) else ())
+        meter = ProgressMeter()
+        entries = 0
+        writer = None
+
+        def progress():
+            rate = writer.bytes_in / meter.elapsed() / (1024 * 1024)
+            return f"Archived {entries} entries, {self.format_size(writer.bytes_in)} ({rate:.1f} MB/s)"
+
+        def include(tarinfo):
+            nonlocal entries
+            if tarinfo.name in skip:
+                return None
+            entries += 1
+            meter.update(progress)
+            return tarinfo
+
+        created = False
+        try:
+            with open(partial, "wb") as f:
+                created = True
+                writer = ParallelGzipWriter(f, level, progress=lambda: meter.update(progress))
+                try:
+                    with tarfile.open(fileobj=writer, mode="w|", bufsize=ARCHIVE_BLOCK) as tar:
+                        tar.add(source, arcname=base, filter=include)
+                    writer.close()
+                except BaseException:
+                    writer.abort()
+                    raise
+            os.replace(partial, output)
+        except (KeyboardInterrupt, OSError, tarfile.TarError) as e:
+            if created:
+                try:
+                    os.unlink(partial)
+                except OSError:
+                    pass
+            if isinstance(e, KeyboardInterrupt):
+                self.fail("archive interrupted", 130)
+            else:
+                self.fail(f"archive: {e}")
+            return
+        finally:
+            meter.clear()
+        ratio = writer.bytes_out / writer.bytes_in * 100 if writer.bytes_in else 0.0
+        rate = writer.bytes_in / meter.elapsed() / (1024 * 1024)
+        print(f"Archived: {source} -> {output} ({entries} entries, {self.format_size(writer.bytes_in)} -> "
+              f"{self.format_size(writer.bytes_out)}, {ratio:.1f}%, {rate:.1f} MB/s)")
+
+    def cmd_extract(self, args):
+        """Unpack a tar archive (plain, .gz, .bz2 or .xz), streaming it"""
+        import gzip
+        import tarfile
+        import zlib
+        if not 1 <= len(args) <= 2:
+            self.fail("Usage: extract <archive> [destination]")
+            return
+        if not hasattr(tarfile, "data_filter"):
+            self.fail("extract needs tarfile extraction filters (Python 3.12, or 3.8.17+, 3.9.17+, 3.10.12+, 3.11.4+)")
+            return
+        archive = os.path.normpath(self.resolve_path(args[0]))
+        destination = os.path.normpath(self.resolve_path(args[1])) if len(args) > 1 else self.current_dir
+        meter = ProgressMeter()
+        counts = {"entries": 0, "bytes": 0}
+
+        def progress():
+            rate = counts["bytes"] / meter.elapsed() / (1024 * 1024)
+            return f"Extracted {counts['entries']} entries, {self.format_size(counts['bytes'])} ({rate:.1f} MB/s)"
+
+        def members(tar):
+            for member in tar:
+                counts["entries"] += 1
+                counts["bytes"] += member.size
+                meter.update(progress)
+                yield member
+
         try:
+            os.makedirs(destination, exist_ok=True)
+            with open(archive, "rb") as raw:
+                # gzip.GzipFile reads every member of a multi-member file; tarfile's own reader stops after the first
+                compressed = raw.read(2) == b"\x1f\x8b"
+                raw.seek(0)
+                source = gzip.GzipFile(fileobj=raw) if compressed else raw
+                with tarfile.open(fileobj=source, mode="r|" if compressed else "r|*", bufsize=CHUNK_SIZE) as tar:
+                    tar.extractall(destination, members=members(tar), filter="data")
+        except KeyboardInterrupt:
+            self.fail(f"extract interrupted after {counts['entries']} entries", 130)
+            return
+        except (OSError, EOFError, zlib.error, tarfile.TarError) as e:
+            self.fail(f"extract: {e}")
+            return
+        finally:
+            meter.clear()
+        rate = counts["bytes"] / meter.elapsed() / (1024 * 1024)
+        print(f"Extracted: {archive} -> {destination} ({counts['entries']} entries, "
+              f"{self.format_size(counts['bytes'])}, {rate:.1f} MB/s)")
+
+    def cmd_hash(self, args):
+        """Print file digests, or check files against a manifest"""
+        import hashlib
+        usage = ("Usage: hash [-a sha256|blake2b|...] [-o MANIFEST] [--no-cache] <paths...>\n"
+                 "       hash [-a ALGORITHM] [--no-cache] --verify MANIFEST")
+        parsed = self.parse_flags(args, ("-a", "-o", "--verify"), ("--no-cache",))
+        if parsed is None or bool(parsed[1]) == ("--verify" in parsed[0]) or \
+                ("-o" in parsed[0] and "--verify" in parsed[0]):
+            self.fail(usage)
+            return
+        options, words = parsed
+        algorithm = options.get("-a", "sha256").lower()
+        if algorithm not in hashlib.algorithms_guaranteed or algorithm.startswith("shake"):
+            choices = sorted(name for name in hashlib.algorithms_guaranteed if not name.startswith("shake"))
+            self.fail(f"hash: unknown algorithm '{algorithm}' (choose from {', '.join(choices)})")
+            return
+        use_cache = "--no-cache" not in options
+        if "--verify" in options:
+            self.verify_manifest(options["--verify"], algorithm, use_cache)
+            return
+
+        files = []  # (display name, path)
+        for word in words:
+            path = self.resolve_path(word)
             if os.path.isdir(path):
-                shutil.rmtree(path)
-                print(f"Directory removed: {path}")
-            elif os.path.exists(path):
-                os.remove(path)
-                print(f"File removed: {path}")
+                files.extend(self.walk_files(word, path))
             else:
-                print(f"No such file or directory: {path}")
-        except Exception as e:
-            print(f"Error removing: {e}")
+                files.append((word, path))
+        try:
+            results = self.digest_files([path for _, path in files], algorithm, use_cache)
+        except KeyboardInterrupt:
+            self.fail("hash interrupted", 130)
+            return
+
+        lines = []
+        errors = 0
+        for display, path in files:
+            digest, error = results[path]
+            if digest is None:
+                print(f"hash: {display}: {error}", file=sys.stderr)
+                errors += 1
+            else:
+                lines.append(f"{digest}  {display}\n")
+        sys.stdout.write("".join(lines))
+        if "-o" in options:
+            try:
+                with open(self.resolve_path(options["-o"]), "w", encoding="utf-8") as f:
+                    f.writelines(lines)
+            except OSError as e:
+                self.fail(f"hash: cannot write {options['-o']}: {e.strerror}")
+                return
+        if errors:
+            self.fail(f"hash: {errors} of {len(files)} files could not be read")
+
+    def verify_manifest(self, manifest, algorithm, use_cache=True):
+        """Check files against 'digest  path' lines (the sha256sum format)"""
+        import hashlib
+        width = hashlib.new(algorithm).digest_size * 2
+        entries = []
+        bad_lines = 0
+        try:
+            with open(self.resolve_path(manifest), encoding="utf-8") as f:
+                for line in f:
+                    digest, _, name = line.rstrip("\n").partition(" ")
+                    name = name[1:] if name[:1] in (" ", "*") else name
+                    if len(digest) != width or not name:
+                        bad_lines += line.strip() != ""
+                        continue
+                    entries.append((name, self.resolve_path(name), digest.lower()))
+        except OSError as e:
+            self.fail(f"hash: cannot read {manifest}: {e.strerror}")
+            return
+        try:
+            results = self.digest_files([path for _, path, _ in entries], algorithm, use_cache)
+        except KeyboardInterrupt:
+            self.fail("hash interrupted", 130)
+            return
+
+        failed = missing = 0
+        for name, path, expected in entries:
+            digest, error = results[path]
+            if digest is None:
+                print(f"{name}: FAILED open or read ({error})")
+                missing += 1
+            elif digest != expected:
+                print(f"{name}: FAILED")
+                failed += 1
+        print(f"Verified {len(entries)} files: {len(entries) - failed - missing} OK, "
+              f"{failed} FAILED, {missing} unreadable")
+        if bad_lines:
+            print(f"hash: {bad_lines} lines of {manifest} are not {algorithm} digests")
+        if failed or missing or bad_lines:
+            self.status = 1
+
+    def walk_files(self, display, root):
+        """List (display name, path) for the regular files under root, in sorted order"""
+        files = []
+        stack = [(display, root)]
+        while stack:
+            shown, directory = stack.pop()
+            try:
+                with os.scandir(directory) as it:
+                    entries = sorted(it, key=lambda entry: entry.name)
+            except OSError as e:
+                print(f"hash: {shown}: {e.strerror}", file=sys.stderr)
+                continue
+            subdirs = []
+            for entry in entries:
+                name = os.path.join(shown, entry.name)
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append((name, entry.path))
+                elif entry.is_file(follow_symlinks=False):
+                    files.append((name, entry.path))
+            stack.extend(reversed(subdirs))
+        return files
+
+    def digest_files(self, paths, algorithm, use_cache=True):
+        """Return {path: (digest, None) or (None, error)}, hashing cache misses on a thread pool.
+
+        The cache is keyed by (device, inode, algorithm) and only trusted while
+        the file's size and mtime match. Digests finished before a Ctrl-C are
+        still saved.
+        """
+        import concurrent.futures
+        results = {}
+        misses = []
+        for path in paths:
+            if path in results:
+                continue
+            try:
+                st = os.stat(path)
+            except OSError as e:
+                results[path] = (None, e.strerror)
+                continue
+            digest = self.store.hash_lookup(st, algorithm) if use_cache else None
+            if digest is not None:
+                results[path] = (digest, None)
+            else:
+                misses.append((path, st))
+
+        meter = ProgressMeter()
+        total = sum(st.st_size for _, st in misses)
+        hashed = 0
+        rows = []
+        executor = concurrent.futures.ThreadPoolExecutor(IO_WORKERS)
+        futures = {executor.submit(hash_file, path, algorithm): (path, st) for path, st in misses}
+        try:
+            for future in concurrent.futures.as_completed(futures):
+                path, st = futures[future]
+                try:
+                    digest = future.result()
+                except OSError as e:
+                    results[path] = (None, e.strerror)
+                    continue
+                results[path] = (digest, None)
+                rows.append((st, algorithm, digest))
+                hashed += st.st_size
+                meter.update(lambda: f"Hashed {len(rows)}/{len(misses)} files, {self.format_size(hashed)} of "
+                                     f"{self.format_size(total)} ({hashed / meter.elapsed() / (1024 * 1024):.1f} MB/s)")
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            meter.clear()
+            if rows:
+                self.store.hash_store(rows)
+        return results
+
+    def copy_progress(self, files, size, meter, total=None):
+        """Progress line for cp and mv"""
+        rate = size / meter.elapsed() / (1024 * 1024)
+        done = f"{self.format_size(size)} of {self.format_size(total)}" if total else self.format_size(size)
+        return f"Copied {files} files, {done} ({rate:.1f} MB/s)"
+
+    def report_copy(self, source, target, result, verb="Copied"):
+        """Print the summary of a copy; returns True when everything was copied"""
+        size = self.format_size(result["bytes"])
+        if result["interrupted"]:
+            self.fail(f"{'mv' if verb == 'Moved' else 'cp'} interrupted: copied {result['files']} files ({size}) to {target}", 130)
+            return False
+        details = [size]
+        if result["dirs"]:
+            details.insert(0, f"{result['files']} files, {result['dirs']} directories")
+        if result["bytes"] >= LARGE_COPY:
+            details.append(f"{result['bytes'] / result['seconds'] / (1024 * 1024):.1f} MB/s")
+        print(f"{verb}: {source} -> {target} ({', '.join(details)})")
+        for message in result["errors"]:
+            print(f"  {message}")
+        if result["error_count"]:
+            self.fail(f"Could not copy {result['error_count']} entries from {source}")
+            return False
+        return True
     
     def cmd_whoami(self, args):
         """Display current username"""
@@ -354,7 +4035,7 @@ class PyOS:
     def cmd_setuser(self, args):
         """Change username"""
         if not args:
-            print("Usage: setuser <new_username>")
+            self.fail("Usage: setuser <new_username>")
             return
             
         self.username = args[0]
@@ -390,7 +4071,7 @@ class PyOS:
 25. Asus Router (Router DB)
 26. HP Built-In PC
 27. Unknown Projector\n""")
-        choice = input(f"{Colors.BLUE}Select a device (1-27):{Fore.RESET} ")
+        choice = input(f"{Colors.BLUE}Select a device (1-27):{Colors.RESET} ")
 
         if choice == "1":
             self.cmd_clear
@@ -401,7 +4082,7 @@ Options for Android
 2. Run Android Stress Exploit
 3. Bruteforce pw
 4. BLE Spam\n""")
-            choice2 = input(f"{Colors.BLUE}Choice:{Fore.RESET} ")
+            choice2 = input(f"{Colors.BLUE}Choice:{Colors.RESET} ")
 
         if choice == "25":
             self.cmd_clear
@@ -412,7 +4093,7 @@ Options for Routers
 2. Asus Stress Exploit
 3. Launch DDOS Attack (183 bots)
 4. Get IP Connection\n""")
-            choice2 = input(f"{Colors.BLUE}Choice:{Fore.RESET} ")
+            choice2 = input(f"{Colors.BLUE}Choice:{Colors.RESET} ")
 
         if choice == "26":
             self.cmd_clear
@@ -422,7 +4103,7 @@ Options for PC
 1. Launch DDOS Attack (183 bots)
 2. Bruceforce pw
 3. BLE Spam\n""")
-            choice2 = input(f"{Colors.BLUE}Choice:{Fore.RESET} ")
+            choice2 = input(f"{Colors.BLUE}Choice:{Colors.RESET} ")
             
         if choice == "27":
             self.cmd_clear
@@ -430,7 +4111,7 @@ Options for PC
 Options for Projector                  
 
 1. IR Remote\n""")
-            choice2 = input(f"{Colors.BLUE}Choice:{Fore.RESET} ")
+            choice2 = input(f"{Colors.BLUE}Choice:{Colors.RESET} ")
 
         else:
             self.cmd_clear
@@ -441,10 +4122,11 @@ Option for Android
 2. Run Android Stress Exploit
 3. Bruteforce pw
 4. BLE Spam\n""")
-            choice2 = input(f"{Colors.BLUE}Choice:{Fore.RESET} ")
+            choice2 = input(f"{Colors.BLUE}Choice:{Colors.RESET} ")
 
 
     def cmd_banner(self, args):
+        import random
         banners = [
         """
           4$$-.                         
@@ -491,6 +4173,7 @@ O|===|* >____________________>     KisueerOS
     
     def cmd_fortune(self, args):
         """Get a random fortune"""
+        import random
         fortunes = [
             "You will have a great day!",
             "Good things come to those who code.",
@@ -507,11 +4190,13 @@ O|===|* >____________________>     KisueerOS
     
     def cmd_flip(self, args):
         """Flip a coin"""
+        import random
         result = random.choice(["Heads", "Tails"])
         print(f"Coin flip: {result}")
     
     def cmd_dice(self, args):
         """Roll a dice"""
+        import random
         sides = 6
         if args and args[0].isdigit():
             sides = int(args[0])
@@ -522,59 +4207,215 @@ O|===|* >____________________>     KisueerOS
     def cmd_note(self, args):
         """Add a note"""
         if not args:
-            print("Usage: note <your note text>")
+            self.fail("Usage: note <your note text>")
             return
             
         note = " ".join(args)
         timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        self.notes.append({"text": note, "timestamp": timestamp})
-        print("Note added!")
+        note_id = self.store.add_note(note, timestamp)
+        if self.search_index is not None:
+            self.search_index.add(("note", note_id), note)
+        print(f"Note #{note_id} added!")
     
     def cmd_notes(self, args):
         """List all notes"""
-        if not self.notes:
-            print("No notes found.")
+        self.write_lines(self.stream_notes(args, None))
+
+    def stream_notes(self, args, lines):
+        """Yield the note listing, one page or all of it"""
+        page = self.parse_page(args, "Usage: notes [--page N]")
+        if page is False:
             return
-            
-        print("=== Notes ===")
-        for i, note in enumerate(self.notes, 1):
-            print(f"{i}. [{note['timestamp']}] {note['text']}")
+        if not self.store.has_notes():
+            yield "No notes found.\n"
+            return
+
+        if page is None:
+            yield "=== Notes ===\n"
+        else:
+            pages = max(1, -(-self.store.count_notes() // PAGE_SIZE))
+            yield f"=== Notes (page {page}/{pages}) ===\n"
+        for note_id, timestamp, text in self.store.notes(page):
+            yield f"{note_id}. [{timestamp}] {text}\n"
+
+    def parse_page(self, args, usage, bool_flags=()):
+        """Read --page N from args; returns the page, None for all, or False on error"""
+        parsed = self.parse_flags(args, ("--page",), bool_flags)
+        if parsed is None or parsed[1] or not parsed[0].get("--page", "1").isdigit():
+            self.fail(usage)
+            return False
+        page = parsed[0].get("--page")
+        return int(page) or 1 if page is not None else None
     
     def cmd_todo(self, args):
         """Add a todo item"""
-        if not args:
-            print("Usage: todo <task description>")
+        usage = "Usage: todo <task description> [--due YYYY-MM-DD[THH:MM]|HH:MM|+N(m|h|d)] [--priority low|normal|high]"
+        # Only --due and --priority are options; any other word (even one
+        # starting with --) is part of the free-form task text
+        options = {}
+        words = []
+        args = list(args)
+        while args:
+            word = args.pop(0)
+            if word in ("--due", "--priority"):
+                if not args:
+                    self.fail(usage)
+                    return
+                options[word] = args.pop(0)
+            else:
+                words.append(word)
+        if not words:
+            self.fail(usage)
+            return
+
+        due = None
+        if "--due" in options:
+            due = self.parse_due(options["--due"])
+            if due is None:
+                self.fail(f"Invalid due date: {options['--due']}")
+                return
+        priority = PRIORITIES.get(options.get("--priority", "normal").lower())
+        if priority is None:
+            self.fail(f"Invalid priority: {options['--priority']}")
             return
             
-        task = " ".join(args)
+        task = " ".join(words)
         timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        self.todos.append({"task": task, "timestamp": timestamp, "done": False})
-        print("Todo added!")
+        todo_id = self.store.add_todo(task, timestamp, due, priority)
+        if self.search_index is not None:
+            self.search_index.add(("todo", todo_id), task)
+        if due is not None:
+            self.scheduler.add(due, priority, todo_id)
+            print(f"Todo #{todo_id} added! Due {self.format_due(due)}")
+        else:
+            print(f"Todo #{todo_id} added!")
+
+    def parse_due(self, value):
+        """Parse a due date into a Unix timestamp, or None if it is invalid"""
+        now = datetime.datetime.now()
+        units = {"m": 60, "h": 3600, "d": 86400}
+        try:
+            if value.startswith("+") and value[-1:] in units:
+                return now.timestamp() + float(value[1:-1]) * units[value[-1]]
+            if ":" in value and "-" not in value:
+                clock = datetime.datetime.strptime(value, "%H:%M")
+                return now.replace(hour=clock.hour, minute=clock.minute, second=0, microsecond=0).timestamp()
+            for fmt in ("%Y-%m-%dT%H:%M", "%Y-%m-%d"):
+                try:
+                    return datetime.datetime.strptime(value, fmt).timestamp()
+                except ValueError:
+                    pass
+        except ValueError:
+            pass
+        return None
+
+    def format_due(self, due):
+        return datetime.datetime.fromtimestamp(due).strftime("%Y-%m-%d %H:%M")
     
     def cmd_todos(self, args):
         """List all todo items"""
-        if not self.todos:
-            print("No todo items found.")
+        self.write_lines(self.stream_todos(args, None))
+
+    def stream_todos(self, args, lines):
+        """Yield the todo listing, optionally only open, due or overdue items or one page"""
+        views = [arg for arg in args if arg in ("--open", "--due", "--overdue")]
+        usage = "Usage: todos [--open | --due | --overdue] [--page N]"
+        page = self.parse_page([arg for arg in args if arg not in views], usage)
+        if page is False:
             return
-            
-        print("=== Todo List ===")
-        for i, todo in enumerate(self.todos, 1):
-            status = "[X]" if todo['done'] else "[ ]"
-            print(f"{i}. {status} {todo['task']} (Added: {todo['timestamp']})")
+        if len(views) > 1:
+            self.fail(usage)
+            return
+        view = views[0] if views else None
+
+        if view in ("--due", "--overdue"):
+            before = time.time() if view == "--overdue" else None
+            title = "Overdue Todos" if before else "Upcoming Todos"
+            rows = self.store.todos_by_due(before, page)
+        else:
+            open_only = view == "--open"
+            title = "Open Todos" if open_only else "Todo List"
+            if not self.store.has_todos(open_only):
+                yield "No open todo items found.\n" if open_only else "No todo items found.\n"
+                return
+            if page is not None:
+                pages = max(1, -(-self.store.count_todos(open_only) // PAGE_SIZE))
+                title += f" (page {page}/{pages})"
+            rows = self.store.todos(page, open_only=open_only)
+
+        header = f"=== {title} ===\n"
+        for todo_id, done, task, timestamp, due, priority in rows:
+            if header:
+                yield header
+                header = None
+            status = "[X]" if done else "[ ]"
+            extra = ""
+            if priority != PRIORITIES["normal"]:
+                extra += f" !{self.priority_name(priority)}"
+            if due is not None:
+                extra += f" (Due: {self.format_due(due)})"
+            yield f"{todo_id}. {status} {task}{extra} (Added: {timestamp})\n"
+        if header:
+            yield "No todo items found.\n"
+
+    def priority_name(self, priority):
+        for name, value in PRIORITIES.items():
+            if value == priority:
+                return name
+        return str(priority)
     
     def cmd_done(self, args):
         """Mark a todo item as done"""
         if not args or not args[0].isdigit():
-            print("Usage: done <todo_number>")
+            self.fail("Usage: done <todo_id>")
             return
             
-        index = int(args[0]) - 1
-        if 0 <= index < len(self.todos):
-            self.todos[index]['done'] = True
-            print(f"Marked todo #{index+1} as done!")
+        todo_id = int(args[0])
+        if self.store.mark_done(todo_id):
+            print(f"Marked todo #{todo_id} as done!")
         else:
-            print("Invalid todo number.")
+            self.fail("Invalid todo number.")
     
+    def get_search_index(self):
+        """Return the search index, building it from the store on first use"""
+        if self.search_index is None:
+            import itertools
+            index = SearchIndex()
+            index.add_many(itertools.chain(
+                ((("note", note_id), text) for note_id, timestamp, text in self.store.notes()),
+                ((("todo", todo_id), task) for todo_id, done, task, timestamp, _, _ in self.store.todos())))
+            self.search_index = index
+            if not isinstance(self.dir_cache.lock, NullLock):
+                self.share_caches()  # built after jobs or sessions started sharing it
+        return self.search_index
+
+    def share_caches(self):
+        """Give the directory cache and search index real locks before other threads use them"""
+        import threading
+        if isinstance(self.dir_cache.lock, NullLock):
+            self.dir_cache.lock = threading.Lock()
+        if self.search_index is not None and isinstance(self.search_index.lock, NullLock):
+            self.search_index.lock = threading.Lock()
+
+    def cmd_search(self, args):
+        """Search notes and todos"""
+        parsed = self.parse_flags(args, ("--limit",))
+        if parsed is None or not parsed[1] or not parsed[0].get("--limit", "1").isdigit():
+            self.fail("Usage: search [--limit N] <terms> [OR <terms>...]")
+            return
+
+        results = self.get_search_index().search(" ".join(parsed[1]), int(parsed[0].get("--limit", 20)))
+        if not results:
+            print("No matches found.")
+            return
+        for score, (kind, doc_id) in results:
+            if kind == "note":
+                _, timestamp, text = self.store.get_note(doc_id)
+                print(f"[note {doc_id}] {text} ({timestamp})")
+            else:
+                _, done, task, timestamp, _, _ = self.store.get_todo(doc_id)
+                print(f"[todo {doc_id}] {'[X]' if done else '[ ]'} {task} ({timestamp})")
+
     def cmd_theme(self, args):
         """Change the theme"""
         themes = ["default", "dark", "light", "colorful"]
@@ -590,7 +4431,7 @@ O|===|* >____________________>     KisueerOS
             print(f"Theme changed to: {theme}")
             self.save_config()
         else:
-            print(f"Unknown theme: {theme}")
+            self.fail(f"Unknown theme: {theme}")
             print(f"Available themes: {', '.join(themes)}")
     
     def cmd_setprompt(self, args):
@@ -610,25 +4451,120 @@ O|===|* >____________________>     KisueerOS
         for key, value in self.config.items():
             print(f"{key}: {value}")
     
+    def cmd_cache(self, args):
+        """Show or clear the directory cache"""
+        action = args[0].lower() if args else "stats"
+        cache = self.dir_cache
+        if action == "stats":
+            lookups = cache.hits + cache.misses
+            hit_rate = cache.hits / lookups * 100 if lookups else 0.0
+            print("=== Directory Cache ===")
+            print(f"Directories: {len(cache.dirs)}/{cache.max_dirs}")
+            print(f"Entries: {cache.items}")
+            print(f"Hits: {cache.hits}")
+            print(f"Misses: {cache.misses}")
+            print(f"Hit rate: {hit_rate:.1f}%")
+            print(f"Memory: {self.format_size(cache.memory_usage())}")
+        elif action == "clear":
+            cache.clear()
+            print("Directory cache cleared.")
+        else:
+            self.fail("Usage: cache [stats|clear]")
+
+    def cmd_profile(self, args):
+        """Run a command under cProfile and show the hotspots"""
+        if not args:
+            self.fail("Usage: profile <command>")
+            return
+        import shlex
+        self.profile_line(shlex.join(args))
+
+    def cmd_stats(self, args):
+        """Show, reset or toggle per-command latency histograms"""
+        action = args[0].lower() if args else "show"
+        if action == "on":
+            if self.timings is None:
+                self.timings = {}
+            print("Command timing on.")
+        elif action == "off":
+            self.timings = None
+            print("Command timing off.")
+        elif action == "reset":
+            if self.timings is not None:
+                self.timings = {}
+            print("Command timings cleared.")
+        elif self.timings is None:
+            print("Command timing is off. Turn it on with 'stats on'.")
+        elif action == "show":
+            if not self.timings:
+                print("No commands timed yet.")
+                return
+            ms = lambda seconds: f"{seconds * 1000:.2f}"
+            print(f"{'COMMAND':<20} {'CALLS':>7} {'MEAN':>9} {'P50':>9} {'P90':>9} {'P99':>9} {'MAX':>9} {'CPU':>9}")
+            for name, histogram in sorted(self.timings.items(), key=lambda item: -item[1].wall):
+                print(f"{name[:20]:<20} {histogram.count:>7} {ms(histogram.wall / histogram.count):>9} "
+                      f"{ms(histogram.percentile(0.5)):>9} {ms(histogram.percentile(0.9)):>9} "
+                      f"{ms(histogram.percentile(0.99)):>9} {ms(histogram.max):>9} "
+                      f"{ms(histogram.cpu / histogram.count):>9}")
+            print("(times in ms; percentiles are histogram bucket bounds)")
+        else:
+            name = " ".join(args).lower()
+            histogram = self.timings.get(name)
+            if histogram is None:
+                self.fail(f"stats: no timings for '{name}'")
+                return
+            print(f"=== {name}: {histogram.count} calls ===")
+            widest = max(count for _, count in histogram.buckets())
+            for bound, count in histogram.buckets():
+                bar = "#" * max(1, count * 40 // widest)
+                print(f"<= {bound * 1000:>10.3f} ms {count:>7} {bar}")
+
     def cmd_calc(self, args):
-        """Simple calculator"""
+        """Safe calculator with variables, math functions and range evaluation"""
+        import re
         if not args:
-            print("Usage: calc <expression>")
+            self.fail("Usage: calc <expression> | calc <name> = <expression> | "
+                      "calc <expression> for <name> in <start>..<stop>[..<step>]")
             return
             
         expr = " ".join(args)
+        if self.calculator is None:
+            self.calculator = Calculator()
+        calculator = self.calculator
         try:
-            # Using eval is generally not safe, but for this simple example it's ok
-            # In a real application, you'd want to use a safer evaluation method
-            result = eval(expr)
-            print(f"{expr} = {result}")
+            batch = re.fullmatch(r"(.+?)\s+for\s+([A-Za-z]\w*)\s+in\s+(\S+?)\.\.(\S+?)(?:\.\.(\S+))?", expr)
+            assignment = re.fullmatch(r"\s*([A-Za-z]\w*)\s*=(?!=)(.+)", expr)
+            if batch:
+                source, name, start, stop, step = batch.groups()
+                start, stop = float(calculator.evaluate(start)), float(calculator.evaluate(stop))
+                step = float(calculator.evaluate(step)) if step else 1.0
+                self.print_range_summary(source, name, calculator.evaluate_range(source, name, start, stop, step))
+            elif assignment:
+                name, source = assignment.groups()
+                print(f"{name} = {calculator.assign(name, source)}")
+            else:
+                result = calculator.evaluate(expr)
+                calculator.variables["ans"] = result
+                print(f"{expr} = {result}")
         except Exception as e:
-            print(f"Error evaluating expression: {e}")
+            self.fail(f"Error evaluating expression: {e}")
+
+    def print_range_summary(self, source, name, values):
+        """Print summary statistics for a calc range evaluation"""
+        count = len(values)
+        if hasattr(values, "min"):
+            low, high, total = float(values.min()), float(values.max()), float(values.sum())
+        else:
+            low, high, total = min(values), max(values), sum(values)
+        preview = ", ".join(f"{float(v):g}" for v in values[:5])
+        print(f"{source} over {count} values of {name}:")
+        print(f"  min = {low:g}, max = {high:g}, mean = {total / count:g}, sum = {total:g}")
+        print(f"  first: {preview}{', ...' if count > 5 else ''}")
     
     def cmd_countdown(self, args):
         """Start a countdown timer"""
         if not args or not args[0].isdigit():
-            print("Usage: countdown <seconds>")
+            self.fail("Usage: countdown <seconds>")
             return
             
         seconds = int(args[0])
@@ -643,8 +4579,85 @@ O|===|* >____________________>     KisueerOS
         except KeyboardInterrupt:
             print("\nCountdown interrupted!")
     
+    async def async_countdown(self, args, job):
+        """Countdown timer that runs as a background job"""
+        import asyncio
+        if not args or not args[0].isdigit():
+            raise ValueError("Usage: countdown <seconds>")
+        for i in range(int(args[0]), 0, -1):
+            job.progress = f"Time remaining: {i} seconds"
+            await asyncio.sleep(1)
+        job.progress = "Countdown finished!"
+
+    def find_job(self, args, usage):
+        """Look up the job named by args (default: the most recent one)"""
+        if self.jobs is None or not self.jobs.jobs:
+            self.fail("No background jobs.")
+            return None
+        if not args:
+            return next(reversed(self.jobs.jobs.values()))
+        job_id = args[0].lstrip("%")
+        if not job_id.isdigit():
+            self.fail(usage)
+            return None
+        job = self.jobs.jobs.get(int(job_id))
+        if job is None:
+            self.fail(f"No such job: {job_id}")
+        return job
+
+    def cmd_jobs(self, args):
+        """List background jobs"""
+        if self.jobs is None or not self.jobs.jobs:
+            print("No background jobs.")
+            return
+        for job in self.jobs.jobs.values():
+            print(job.describe())
+
+    def cmd_fg(self, args):
+        """Wait for a background job in the foreground"""
+        import concurrent.futures
+        job = self.find_job(args, "Usage: fg [job_id]")
+        if job is None:
+            return
+        print(job.command)
+        try:
+            while True:
+                try:
+                    job.future.result(timeout=0.2)
+                    break
+                except concurrent.futures.TimeoutError:
+                    if job.progress:
+                        sys.stdout.write(f"\r{job.progress}")
+                        sys.stdout.flush()
+        except KeyboardInterrupt:
+            print(f"\n[{job.id}] left running in the background")
+            return
+        except (concurrent.futures.CancelledError, Exception):
+            pass
+        if job.progress:
+            print(f"\r{job.progress}")
+        self.jobs.jobs.pop(job.id, None)
+        print(job.describe())
+        if job.state != "Done":
+            self.status = 1
+
+    def cmd_kill(self, args):
+        """Stop a background job"""
+        job = self.find_job(args, "Usage: kill [job_id]")
+        if job is None:
+            return
+        if job.state != "Running":
+            print(f"[{job.id}] already finished")
+            return
+        self.jobs.kill(job)
+        if job.threaded:
+            print(f"[{job.id}] killed (its worker thread finishes the current step on its own)")
+        else:
+            print(f"[{job.id}] killed")
+
     def cmd_weather(self, args):
         """Display simulated weather"""
+        import random
         conditions = ["Sunny", "Cloudy", "Rainy", "Snowy", "Windy", "Stormy", "Foggy", "Clear"]
         temps = list(range(0, 40))  # 0 to 39 degrees Celsius
         
@@ -658,6 +4671,171 @@ O|===|* >____________________>     KisueerOS
         print(f"Humidity: {humidity}%")
 
 
-if __name__ == "__main__":
+_IMPORT_END = time.perf_counter()
+
+USAGE = """usage: kisueeros.py [-h] [-c COMMAND] [-e] [--startup-profile]
+                    [--serve SOCKET | --connect SOCKET] [script]
+
+  -c COMMAND           run a command and exit (may be repeated)
+  -e, --stop-on-error  stop at the first failing command
+  --startup-profile    print the import/init time breakdown
+  --serve SOCKET       serve shell sessions on a Unix socket
+  --connect SOCKET     open a session on a running server
+  script               file of commands to run ('-' for stdin)"""
+
+DEFERRED_MODULES = ["json", "random", "platform", "shutil", "re", "shlex", "mmap", "colorama"]
+
+
+def parse_options(argv):
+    """Parse command line options without paying for argparse at startup"""
+    options = {"commands": [], "stop_on_error": False, "startup_profile": False, "script": None,
+               "serve": None, "connect": None}
+    args = list(argv)
+    while args:
+        arg = args.pop(0)
+        if arg in ("-h", "--help"):
+            print(USAGE)
+            sys.exit(0)
+        elif arg == "-c" and args:
+            options["commands"].append(args.pop(0))
+        elif arg in ("-e", "--stop-on-error"):
+            options["stop_on_error"] = True
+        elif arg == "--startup-profile":
+            options["startup_profile"] = True
+        elif arg in ("--serve", "--connect") and args and not options["serve"] and not options["connect"]:
+            options[arg[2:]] = args.pop(0)
+        elif options["script"] is None and (arg == "-" or not arg.startswith("-")):
+            options["script"] = arg
+        else:
+            print(USAGE, file=sys.stderr)
+            sys.exit(2)
+    return options
+
+
+def print_startup_profile(init_time):
+    """Print where cold start time went"""
+    import_ms = (_IMPORT_END - _IMPORT_START) * 1000
+    init_ms = init_time * 1000
+    total_ms = import_ms + init_ms
+    verdict = "OK" if total_ms <= STARTUP_BUDGET_MS else "OVER BUDGET"
+    loaded = [name for name in DEFERRED_MODULES if name in sys.modules]
+    print("=== Startup Profile ===", file=sys.stderr)
+    print(f"Module import:  {import_ms:8.2f} ms", file=sys.stderr)
+    print(f"PyOS.__init__:  {init_ms:8.2f} ms", file=sys.stderr)
+    print(f"Total:          {total_ms:8.2f} ms (budget {STARTUP_BUDGET_MS:.0f} ms: {verdict})", file=sys.stderr)
+    print(f"Deferred modules loaded: {', '.join(loaded) or 'none'}", file=sys.stderr)
+
+
+def main(argv=None):
+    options = parse_options(sys.argv[1:] if argv is None else argv)
+    if options["connect"]:
+        return run_client(options["connect"], options["commands"], options["stop_on_error"])
+
+    init_start = time.perf_counter()
     pyos = PyOS()
+    if options["startup_profile"]:
+        print_startup_profile(time.perf_counter() - init_start)
+
+    try:
+        return run_session(pyos, options)
+    finally:
+        pyos.close()
+
+
+def run_session(pyos, options):
+    """Run the shell in the mode selected on the command line"""
+    stop_on_error = options["stop_on_error"]
+    script = options["script"]
+    if options["serve"]:
+        return SessionServer(pyos, options["serve"]).run()
+    if options["commands"]:
+        return pyos.run_batch(options["commands"], stop_on_error)
+    if script == "-" or (script is None and not sys.stdin.isatty()):
+        return pyos.run_batch(sys.stdin, stop_on_error)
+    if script:
+        try:
+            with open(script, "r", encoding="utf-8") as f:
+                return pyos.run_batch(f, stop_on_error)
+        except OSError as e:
+            print(f"Cannot open script: {e}", file=sys.stderr)
+            return 2
     pyos.run()
+    return pyos.exit_code
+
+
+def run_client(path, commands=(), stop_on_error=False):
+    """Run a session on a --serve process, interactively or over commands/stdin"""
+    import json
+    import socket
+    import struct
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except OSError as e:
+        print(f"Cannot connect to {path}: {e.strerror or e}", file=sys.stderr)
+        return 2
+
+    interactive = not commands and sys.stdin.isatty()
+    readline = None
+    if interactive:
+        try:
+            import readline
+        except ImportError:
+            pass
+    lines = iter(commands or sys.stdin)
+
+    def next_line(prompt):
+        if not interactive:
+            for line in lines:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    return line
+            return None
+        while True:
+            try:
+                return input(readline_prompt(prompt) if readline else prompt)
+            except KeyboardInterrupt:
+                print("\nUse 'exit' to quit PyOS.")
+            except EOFError:
+                print()
+                return None
+
+    status = 0
+    out = sys.stdout.buffer
+    with sock, sock.makefile("rb") as reader:
+        try:
+            hello = {"cwd": os.getcwd(), "tty": sys.stdout.isatty()}
+            sock.sendall(json.dumps(hello).encode() + b"\n")
+            while True:
+                header = reader.read(5)
+                if len(header) < 5:
+                    return status
+                kind, size = struct.unpack("!cI", header)
+                payload = reader.read(size)
+                if kind == b"O":
+                    try:
+                        out.write(payload)
+                        out.flush()
+                    except BrokenPipeError:
+                        return 141  # like a shell, when our reader goes away
+                elif kind == b"S":
+                    status = int(payload)
+                    if status and stop_on_error and not interactive:
+                        return status
+                elif kind == b"X":
+                    return int(payload)
+                elif kind == b"P":
+                    line = next_line(payload.decode("utf-8", errors="replace"))
+                    if line is None:
+                        return status
+                    sock.sendall(line.encode("utf-8", errors="replace") + b"\n")
+        except KeyboardInterrupt:
+            print()
+            return 130
+        except ConnectionError as e:
+            print(f"Connection to {path} lost: {e.strerror or e}", file=sys.stderr)
+            return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
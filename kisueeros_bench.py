@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""Reproducible benchmarks for KisueerOS.
+
+Each workload builds its fixtures in a scratch directory, then replays a
+seeded list of command lines through PyOS.parse_input and records the latency
+of every call. Results are printed as JSON so runs can be compared across
+versions:
+
+    python kisueeros_bench.py --seed 1 --scale 1.0 > before.json
+"""
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import kisueeros
+
+WORKLOADS = {}
+
+
+def workload(name):
+    """Register a workload: a function (rng, scale, workdir) returning command lines"""
+    def register(function):
+        WORKLOADS[name] = function
+        return function
+    return register
+
+
+@workload("ls_huge")
+def ls_huge(rng, scale, workdir):
+    directory = os.path.join(workdir, "huge")
+    os.mkdir(directory)
+    for i in range(int(20000 * scale)):
+        with open(os.path.join(directory, f"file_{i:06d}_{rng.randrange(10 ** 6)}.txt"), "w") as f:
+            f.write("x" * rng.randrange(64))
+    return [rng.choice(["ls huge", "ls -l huge", "ls -S huge", "ls -t huge"]) for _ in range(40)]
+
+
+@workload("cat_large")
+def cat_large(rng, scale, workdir):
+    path = os.path.join(workdir, "large.log")
+    with open(path, "w") as f:
+        for i in range(int(500000 * scale)):
+            f.write(f"{i} {rng.choice(['INFO', 'WARN', 'ERROR'])} request {rng.randrange(10 ** 9)}\n")
+    return [rng.choice(["cat large.log", "cat --tail 20 large.log", "cat --head 20 large.log",
+                        "cat large.log | grep ERROR | head 20", "cat --range 1000:200000 large.log"])
+            for _ in range(20)]
+
+
+@workload("notes")
+def notes(rng, scale, workdir):
+    words = ["alpha", "beta", "gamma", "delta", "disk", "network", "deploy", "review", "bug", "meeting"]
+    count = int(5000 * scale)
+    commands = [f"note {' '.join(rng.choice(words) for _ in range(6))} {i}" for i in range(count)]
+    commands += [f"notes --page {rng.randrange(1, count // kisueeros.PAGE_SIZE + 2)}" for _ in range(200)]
+    commands += [f"search {rng.choice(words)} {rng.choice(words)[:3]}*" for _ in range(200)]
+    return commands
+
+
+@workload("todos")
+def todos(rng, scale, workdir):
+    count = int(5000 * scale)
+    commands = []
+    for i in range(count):
+        due = f" --due +{rng.randrange(1, 600)}m" if rng.random() < 0.5 else ""
+        commands.append(f"todo task {i}{due} --priority {rng.choice(list(kisueeros.PRIORITIES))}")
+    commands += [f"done {rng.randrange(1, count + 1)}" for _ in range(count // 5)]
+    commands += [rng.choice(["todos --open --page 1", "todos --due --page 1", "todos --overdue"])
+                 for _ in range(200)]
+    return commands
+
+
+@workload("calc_storm")
+def calc_storm(rng, scale, workdir):
+    templates = ["{a} + {b} * {c}", "sqrt({a}) + log({b} + 1)", "sin({a}) * cos({b})",
+                 "({a} - {b}) / ({c} + 1)", "x = {a}", "x * {b} + ans"]
+    commands = ["calc x = 1", "calc 0"]
+    for _ in range(int(20000 * scale)):
+        values = {key: rng.randrange(1, 1000) for key in "abc"}
+        commands.append("calc " + rng.choice(templates).format(**values))
+    return commands
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(latencies, elapsed):
+    """Turn per-call latencies (seconds) into a JSON-friendly summary in milliseconds"""
+    ordered = sorted(latencies)
+    return {
+        "operations": len(ordered),
+        "seconds": round(elapsed, 6),
+        "throughput_ops": round(len(ordered) / elapsed, 2) if elapsed else None,
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 4) if ordered else 0.0,
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 4),
+        "p90_ms": round(percentile(ordered, 0.90) * 1000, 4),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 4),
+        "max_ms": round(ordered[-1] * 1000, 4) if ordered else 0.0,
+    }
+
+
+def run_workload(name, seed, scale):
+    """Build a workload's fixtures in a scratch directory and replay its commands"""
+    rng = random.Random(f"{seed}:{name}")
+    previous_dir = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix=f"kisueeros-bench-{name}-") as workdir:
+        os.chdir(workdir)
+        try:
+            commands = WORKLOADS[name](rng, scale, workdir)
+            pyos = kisueeros.PyOS()
+            pyos.interactive = False
+            latencies = []
+            real_stdout = sys.stdout
+            with open(os.devnull, "w") as devnull:
+                sys.stdout = devnull
+                started = time.perf_counter()
+                try:
+                    for command in commands:
+                        before = time.perf_counter()
+                        pyos.parse_input(command)
+                        latencies.append(time.perf_counter() - before)
+                finally:
+                    elapsed = time.perf_counter() - started
+                    sys.stdout = real_stdout
+                    pyos.close()
+        finally:
+            os.chdir(previous_dir)
+    return summarize(latencies, elapsed)
+
+
+def run_startup(runs):
+    """Time cold starts of the shell running a trivial command"""
+    script = os.path.join(os.path.dirname(os.path.abspath(kisueeros.__file__)), "kisueeros.py")
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(runs):
+        before = time.perf_counter()
+        subprocess.run([sys.executable, script, "-c", "pwd"], stdout=subprocess.DEVNULL, check=True)
+        latencies.append(time.perf_counter() - before)
+    return summarize(latencies, time.perf_counter() - started)
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Benchmark KisueerOS with reproducible workloads")
+    parser.add_argument("--seed", type=int, default=1, help="random seed for workloads (default: 1)")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply workload sizes (default: 1.0)")
+    parser.add_argument("--only", help="comma-separated workloads to run (default: all, plus startup)")
+    parser.add_argument("--startup-runs", type=int, default=20, help="cold starts to time (default: 20)")
+    parser.add_argument("--output", help="write the JSON report to this file instead of stdout")
+    options = parser.parse_args(argv)
+
+    names = options.only.split(",") if options.only else list(WORKLOADS) + ["startup"]
+    unknown = [name for name in names if name not in WORKLOADS and name != "startup"]
+    if unknown:
+        parser.error(f"unknown workloads: {', '.join(unknown)} (choose from {', '.join(WORKLOADS)}, startup)")
+
+    report = {
+        "seed": options.seed,
+        "scale": options.scale,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "results": {},
+    }
+    for name in names:
+        print(f"Running {name}...", file=sys.stderr)
+        if name == "startup":
+            report["results"][name] = run_startup(options.startup_runs)
+        else:
+            report["results"][name] = run_workload(name, options.seed, options.scale)
+
+    text = json.dumps(report, indent=2)
+    if options.output:
+        with open(options.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())